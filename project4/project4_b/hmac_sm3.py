@@ -0,0 +1,81 @@
+"""
+HMAC-SM3（RFC 2104 结构）：HMAC(K, m) = SM3((K' ⊕ opad) || SM3((K' ⊕ ipad) || m))
+- K' 为密钥补 0 到 64 字节（超过 64 字节时先取 SM3(K)）；
+- K' ⊕ ipad 与 K' ⊕ opad 恰为一个分组，按密钥预先压缩得到内外两个链接变量，
+  之后每条消息借助 sm3_core 的自定义 iv / total_bytes_prefix 从这两个状态继续：
+  内层只压缩消息本身的分组，外层（32 字节摘要 + 填充）只需一次压缩；
+- hmac_sm3(key, msg) 按密钥缓存预计算的状态，同一密钥反复签名时密钥处理的开销被摊销。
+
+与 length_extension.py 中可被伪造的 SM3(secret || msg) 不同，外层哈希隐藏了内层的链接变量，长度扩展攻击不再适用。
+"""
+from __future__ import annotations
+import hmac
+from functools import lru_cache
+from typing import List, Tuple
+
+from sm3_core import IV_DEFAULT, SM3, _compress_fast
+
+BLOCK_SIZE = 64
+DIGEST_SIZE = 32
+IPAD = 0x36
+OPAD = 0x5C
+
+
+def _key_states(key: bytes) -> Tuple[List[int], List[int]]:
+    """由密钥计算 (K' ⊕ ipad, K' ⊕ opad) 各压缩一个分组后的链接变量。"""
+    if len(key) > BLOCK_SIZE:
+        key = SM3(key).digest()
+    key = key.ljust(BLOCK_SIZE, b"\x00")
+    inner = _compress_fast(IV_DEFAULT, bytes(b ^ IPAD for b in key))
+    outer = _compress_fast(IV_DEFAULT, bytes(b ^ OPAD for b in key))
+    return inner, outer
+
+
+class HMAC_SM3:
+    """绑定一个密钥的 HMAC-SM3，构造时预计算内外链接变量。"""
+    digest_size = DIGEST_SIZE
+    block_size = BLOCK_SIZE
+
+    def __init__(self, key: bytes) -> None:
+        self._inner, self._outer = _key_states(bytes(key))
+
+    def mac(self, msg: bytes) -> bytes:
+        """返回 32 字节的 MAC。"""
+        inner = SM3(msg, iv=self._inner, total_bytes_prefix=BLOCK_SIZE).digest()
+        return SM3(inner, iv=self._outer, total_bytes_prefix=BLOCK_SIZE).digest()
+
+    def hexmac(self, msg: bytes) -> str:
+        """返回 MAC 的十六进制小写字符串。"""
+        return self.mac(msg).hex()
+
+    def verify(self, msg: bytes, tag: bytes) -> bool:
+        """以常数时间比较验证 MAC。"""
+        return hmac.compare_digest(self.mac(msg), tag)
+
+
+@lru_cache(maxsize=1024)
+def _cached_hmac(key: bytes) -> HMAC_SM3:
+    return HMAC_SM3(key)
+
+
+def hmac_sm3(key: bytes, msg: bytes) -> str:
+    """计算 HMAC-SM3，返回十六进制小写字符串；每个密钥的内外状态按 LRU 缓存（最多 1024 个密钥）。"""
+    return _cached_hmac(bytes(key)).hexmac(msg)
+
+
+if __name__ == "__main__":
+    import time
+
+    key = b"api-signing-key"
+    requests = [b"GET /v1/orders?id=%d&ts=1700000000" % i for i in range(2000)]
+    start_time = time.time()
+    tags = [hmac.new(key, r, lambda d=b"": SM3(d)).digest() for r in requests]
+    elapsed = time.time() - start_time
+    print("标准库 hmac + SM3: %.1f 微秒/条" % (elapsed / len(requests) * 1e6))
+
+    signer = HMAC_SM3(key)
+    start_time = time.time()
+    ours = [signer.mac(r) for r in requests]
+    elapsed = time.time() - start_time
+    print("预计算内外状态:    %.1f 微秒/条" % (elapsed / len(requests) * 1e6))
+    print("结果一致: ", ours == tags)
@@ -8,8 +8,9 @@ SM3 长度扩展攻击演示
 """
 from __future__ import annotations
 import os
-from typing import Tuple
-from sm3_core import sm3_hash, parse_digest_to_iv, sm3_pad_bytes_for_len
+import random
+from typing import Dict, Iterable, Iterator, Tuple
+from sm3_core import SM3, sm3_hash, parse_digest_to_iv, sm3_pad_bytes_for_len, _compress_fast
 
 
 def victim_oracle(secret: bytes, msg: bytes) -> str:
@@ -38,6 +39,34 @@ def attacker_length_extension(old_digest_hex: str, known_msg: bytes, secret_len:
     return new_digest, forged_suffix
 
 
+def batch_length_extension(captures: Iterable[Tuple[str, bytes]], secret_lens: Iterable[int],
+                           append_msg: bytes) -> Iterator[Tuple[int, int, str, bytes]]:
+    """
+    批量长度扩展伪造（生成器）：对每条截获的 (摘要, 已知消息) 与每个候选密钥长度，依次产出
+    (截获序号, 候选长度, 伪造摘要, 伪造后缀 pad||append_msg)。
+    - 每条摘要只解析一次 IV，并从该 IV 压缩一次 append_msg 的完整分组，得到可复用的链接变量；
+    - 伪造摘要只依赖于 |S||M||pad| 这一 64 字节对齐的总长度，不同候选长度常常落在同一对齐值上，
+      每个对齐值只对 append_msg 的尾部与填充做一次压缩；
+    - 结果以生成器逐条产出，可以直接流式处理大量截获记录。
+    """
+    secret_lens = list(secret_lens)
+    full = len(append_msg) & ~63
+    tail = append_msg[full:]
+    for index, (digest_hex, known_msg) in enumerate(captures):
+        v = parse_digest_to_iv(digest_hex)
+        for off in range(0, full, 64):
+            v = _compress_fast(v, append_msg, off)
+        forged: Dict[int, str] = {}
+        for secret_len in secret_lens:
+            total_len_before_pad = secret_len + len(known_msg)
+            pad = sm3_pad_bytes_for_len(total_len_before_pad)
+            total_prefix = total_len_before_pad + len(pad)
+            digest = forged.get(total_prefix)
+            if digest is None:
+                digest = forged[total_prefix] = SM3(tail, iv=v, total_bytes_prefix=total_prefix + full).hexdigest()
+            yield index, secret_len, digest, pad + append_msg
+
+
 def demo_once() -> None:
     # 模拟未知前缀（受害者持有，攻击者只知道长度）
     secret = os.urandom(16)  # 示例：随机 16 字节作为“密钥前缀”
@@ -60,5 +89,20 @@ def demo_once() -> None:
     print("伪造的完整消息（十六进制）:", (known_msg + forged_suffix).hex())
 
 
+def demo_batch(count: int = 20, max_secret_len: int = 64) -> None:
+    """截获若干条使用不同长度密钥的 MAC，批量枚举密钥长度并用受害者接口确认哪一个伪造成立。"""
+    append_msg = b"&amount=1000000"
+    secrets = [os.urandom(random.randint(1, max_secret_len)) for _ in range(count)]
+    msgs = [b"user=u%d&action=transfer&amount=100" % i for i in range(count)]
+    captures = [(victim_oracle(s, m), m) for s, m in zip(secrets, msgs)]
+    found = {}
+    for index, secret_len, digest, suffix in batch_length_extension(captures, range(1, max_secret_len + 1), append_msg):
+        if index not in found and digest == victim_oracle(secrets[index], msgs[index] + suffix):
+            found[index] = secret_len
+    print("批量伪造: %d 条截获记录，成功 %d 条，密钥长度全部正确: %s" % (
+        count, len(found), all(found[i] == len(secrets[i]) for i in found)))
+
+
 if __name__ == "__main__":
-    demo_once()
\ No newline at end of file
+    demo_once()
+    demo_batch()
\ No newline at end of file
@@ -0,0 +1,274 @@
+"""
+基于 SM3 的 RFC 6962 Merkle 树：
+- 叶子哈希 SM3(0x00 || d)，内部节点哈希 SM3(0x01 || 左 || 右)，空树的根为 SM3("")；
+- 逐层批量构建：每层的全部节点一次送入批量哈希（安装 NumPy 时使用 sm3_multi 的多缓冲 SM3，
+  否则逐个使用 sm3_core.SM3），奇数个节点时最后一个直接提升到上一层，结果与 RFC 6962 的递归定义一致；
+- 每层以一个连续的 bytearray 保存（每节点 32 字节），不为节点创建 Python 对象，
+  100 万个叶子的整棵树约占 64 MB；
+- 存证明（inclusion proof）与一致性证明（consistency proof）直接读取已保存的层，O(log n) 生成，无需重算。
+
+所有摘要均为 32 字节的 bytes。
+"""
+from __future__ import annotations
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from sm3_core import SM3
+
+try:
+    from sm3_multi import np, sm3_digest_many, sm3_digest_fixed
+except ImportError:
+    np = None
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+HASH_SIZE = 32
+
+# 叶子数据按批读取并哈希，限制构建时临时对象的数量
+LEAF_BATCH_SIZE = 1 << 15
+
+EMPTY_ROOT = SM3().digest()
+
+
+def leaf_hash(data: bytes) -> bytes:
+    """叶子哈希 SM3(0x00 || data)。"""
+    h = SM3(LEAF_PREFIX)
+    h.update(data)
+    return h.digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """内部节点哈希 SM3(0x01 || left || right)。"""
+    return SM3(NODE_PREFIX + left + right).digest()
+
+
+def _hash_leaves(leaves: Sequence[bytes]) -> bytes:
+    """批量计算叶子哈希，返回首尾相接的摘要。"""
+    if np is not None:
+        return b"".join(sm3_digest_many([LEAF_PREFIX + bytes(d) for d in leaves]))
+    return b"".join(leaf_hash(d) for d in leaves)
+
+
+def _hash_pairs(level: bytes, pairs: int, prefix: bytes = NODE_PREFIX) -> bytes:
+    """对 level 开头的 pairs 个 64 字节记录（相邻两个节点）批量计算 SM3(prefix || 记录)，返回首尾相接的摘要。"""
+    if np is not None:
+        return sm3_digest_fixed(memoryview(level)[:pairs * 2 * HASH_SIZE], 2 * HASH_SIZE, prefix)
+    out = bytearray()
+    state = SM3(prefix)
+    with memoryview(level) as mv:
+        for off in range(0, pairs * 2 * HASH_SIZE, 2 * HASH_SIZE):
+            h = state.copy()
+            h.update(mv[off:off + 2 * HASH_SIZE])
+            out += h.digest()
+    return bytes(out)
+
+
+def _split(n: int) -> int:
+    """小于 n 的最大 2 的幂（n > 1），即 RFC 6962 中的 k。"""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+class MerkleTree:
+    """
+    RFC 6962 Merkle 树。
+    - MerkleTree(leaves)：由叶子数据（bytes 的可迭代对象）构建；
+    - MerkleTree.from_leaf_hashes(hashes)：由首尾相接的 32 字节叶子哈希构建；
+    - levels[l] 的第 i 个节点覆盖叶子区间 [i·2^l, min((i+1)·2^l, size))，其值即该区间的 MTH。
+    """
+
+    def __init__(self, leaves: Iterable[bytes] = ()) -> None:
+        level0 = bytearray()
+        batch: List[bytes] = []
+        for d in leaves:
+            batch.append(d)
+            if len(batch) == LEAF_BATCH_SIZE:
+                level0 += _hash_leaves(batch)
+                batch.clear()
+        if batch:
+            level0 += _hash_leaves(batch)
+        self._build(level0)
+
+    @classmethod
+    def from_leaf_hashes(cls, hashes: bytes) -> "MerkleTree":
+        """由首尾相接的叶子哈希（每个 32 字节）构建。"""
+        if len(hashes) % HASH_SIZE:
+            raise ValueError("叶子哈希的总长度必须是 32 的整数倍")
+        tree = cls.__new__(cls)
+        tree._build(bytearray(hashes))
+        return tree
+
+    def _build(self, level0: bytearray) -> None:
+        self.levels: List[bytearray] = [level0]
+        self._build_up()
+
+    def _build_up(self) -> None:
+        """从 levels 的最后一层开始逐层向上构建，直到只剩根节点。"""
+        level = self.levels[-1]
+        while len(level) > HASH_SIZE:
+            count = len(level) // HASH_SIZE
+            parent = bytearray(_hash_pairs(level, count // 2))
+            if count & 1:
+                parent += level[-HASH_SIZE:]
+            self.levels.append(parent)
+            level = parent
+
+    @property
+    def size(self) -> int:
+        """叶子个数。"""
+        return len(self.levels[0]) // HASH_SIZE
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _node(self, level: int, index: int) -> bytes:
+        off = index * HASH_SIZE
+        return bytes(self.levels[level][off:off + HASH_SIZE])
+
+    def leaf(self, index: int) -> bytes:
+        """第 index 个叶子的哈希。"""
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return self._node(0, index)
+
+    def root(self, tree_size: Optional[int] = None) -> bytes:
+        """前 tree_size 个叶子构成的树的根（缺省为整棵树）。"""
+        n = self.size if tree_size is None else tree_size
+        if not 0 <= n <= self.size:
+            raise ValueError("tree_size 超出范围")
+        if n == 0:
+            return EMPTY_ROOT
+        return self._subtree_hash(0, n)
+
+    def _subtree_hash(self, start: int, end: int) -> bytes:
+        """MTH(D[start:end])。区间对应某个已保存节点时直接读取，否则按 RFC 6962 在 k 处拆分后组合。"""
+        n = end - start
+        l = (n - 1).bit_length()
+        if not start & ((1 << l) - 1) and (n == 1 << l or end == self.size):
+            return self._node(l, start >> l)
+        k = _split(n)
+        return node_hash(self._subtree_hash(start, start + k), self._subtree_hash(start + k, end))
+
+    def inclusion_proof(self, index: int, tree_size: Optional[int] = None) -> List[bytes]:
+        """叶子 index 在前 tree_size 个叶子构成的树中的存在性证明 PATH(index, D[0:tree_size])，由叶向根排列。"""
+        n = self.size if tree_size is None else tree_size
+        if not 0 <= index < n <= self.size:
+            raise ValueError("index 或 tree_size 超出范围")
+        return _inclusion_path(self._subtree_hash, index, n)
+
+    def consistency_proof(self, old_size: int, new_size: Optional[int] = None) -> List[bytes]:
+        """前 old_size 个叶子的树与前 new_size 个叶子的树之间的一致性证明 PROOF(old_size, D[0:new_size])。"""
+        n = self.size if new_size is None else new_size
+        if not 0 <= old_size <= n <= self.size:
+            raise ValueError("old_size 或 new_size 超出范围")
+        return _consistency_path(self._subtree_hash, old_size, n)
+
+
+def _inclusion_path(subtree_hash: Callable[[int, int], bytes], index: int, n: int) -> List[bytes]:
+    """PATH(index, D[0:n])，subtree_hash(start, end) 给出 MTH(D[start:end])。"""
+    proof: List[bytes] = []
+    start, end = 0, n
+    while end - start > 1:
+        k = _split(end - start)
+        if index < start + k:
+            proof.append(subtree_hash(start + k, end))
+            end = start + k
+        else:
+            proof.append(subtree_hash(start, start + k))
+            start += k
+    proof.reverse()
+    return proof
+
+
+def _consistency_path(subtree_hash: Callable[[int, int], bytes], old_size: int, n: int) -> List[bytes]:
+    """PROOF(old_size, D[0:n])，subtree_hash(start, end) 给出 MTH(D[start:end])。"""
+    if old_size == 0 or old_size == n:
+        return []
+    proof: List[bytes] = []
+    m, start, end, complete = old_size, 0, n, True
+    while m != end - start:
+        k = _split(end - start)
+        if m <= k:
+            proof.append(subtree_hash(start + k, end))
+            end = start + k
+        else:
+            proof.append(subtree_hash(start, start + k))
+            start += k
+            m -= k
+            complete = False
+    if not complete:
+        proof.append(subtree_hash(start, end))
+    proof.reverse()
+    return proof
+
+def verify_inclusion(leaf: bytes, index: int, tree_size: int, proof: Sequence[bytes], root: bytes) -> bool:
+    """验证叶子哈希 leaf 位于大小为 tree_size、根为 root 的树的第 index 个位置（RFC 9162 2.1.3.2）。"""
+    if not 0 <= index < tree_size:
+        return False
+    fn, sn, r = index, tree_size - 1, leaf
+    for p in proof:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = node_hash(p, r)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            r = node_hash(r, p)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and r == root
+
+
+def verify_consistency(old_size: int, new_size: int, old_root: bytes, new_root: bytes, proof: Sequence[bytes]) -> bool:
+    """验证大小为 old_size 的树是大小为 new_size 的树的前缀（RFC 9162 2.1.4.2）。"""
+    if not 0 <= old_size <= new_size:
+        return False
+    if old_size == new_size:
+        return not proof and old_root == new_root
+    if old_size == 0:
+        return not proof
+    if not proof:
+        return False
+    path = list(proof)
+    if old_size & (old_size - 1) == 0:
+        path.insert(0, old_root)
+    fn, sn = old_size - 1, new_size - 1
+    while fn & 1:
+        fn >>= 1
+        sn >>= 1
+    fr = sr = path[0]
+    for c in path[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            fr = node_hash(c, fr)
+            sr = node_hash(c, sr)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            sr = node_hash(sr, c)
+        fn >>= 1
+        sn >>= 1
+    return fr == old_root and sr == new_root and sn == 0
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    n = 100000
+    start_time = time.time()
+    tree = MerkleTree(os.urandom(32) for _ in range(n))
+    print("叶子数: %d, 构建耗时 %.2f 秒" % (n, time.time() - start_time))
+    print("根: ", tree.root().hex())
+
+    index = 12345
+    proof = tree.inclusion_proof(index)
+    print("叶子 %d 的存在性证明长度 %d, 验证: %s"
+          % (index, len(proof), verify_inclusion(tree.leaf(index), index, n, proof, tree.root())))
+
+    old = 60000
+    proof = tree.consistency_proof(old)
+    print("%d -> %d 的一致性证明长度 %d, 验证: %s"
+          % (old, n, len(proof), verify_consistency(old, n, tree.root(old), tree.root(), proof)))
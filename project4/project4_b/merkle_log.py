@@ -0,0 +1,226 @@
+"""
+只追加（append-only）的 RFC 6962 Merkle 日志：
+- 内存中只保存右侧边界（frontier）：当前叶子数 n 的二进制表示中每个 1 对应一棵满二叉子树的根，共至多 log2(n)+1 个；
+- 追加一个叶子时，与边界上同高度的子树依次合并，平均每个叶子只需 1 次叶子哈希 + 1 次内部节点哈希；
+  批量追加时逐层计算新完成的节点，每层的内部节点一次送入批量哈希（安装 NumPy 时为多缓冲 SM3）；
+- 每个完成的满子树节点（含叶子）按完成顺序（即后序）追加写入节点文件，每个节点 32 字节，
+  节点 (高度 l, 序号 i) 在文件中的位置为 f((i+1)·2^l - 1) + l，其中 f(m) = 2m - popcount(m) 为 m 个叶子的森林中的节点数；
+- 任意历史大小的根、存在性证明与一致性证明都由文件中的满子树节点组合得到，无需重建整棵树。
+
+重新打开已有文件时，由文件长度恢复叶子数，并从文件中读回边界；末尾不完整的记录（如写入中断）会被截去。
+"""
+from __future__ import annotations
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from merkle import EMPTY_ROOT, HASH_SIZE, leaf_hash, node_hash, _hash_leaves, _hash_pairs, _split, \
+    _inclusion_path, _consistency_path
+
+# extend() / extend_hashes() 每批处理的叶子数
+APPEND_BATCH_SIZE = 1 << 15
+
+
+def _forest_nodes(n: int) -> int:
+    """n 个叶子构成的满子树森林中的节点总数（即节点文件中的记录数）。"""
+    return 2 * n - bin(n).count("1")
+
+
+def _node_pos(level: int, index: int) -> int:
+    """满子树节点 (level, index) 在节点文件中的记录序号。"""
+    return _forest_nodes(((index + 1) << level) - 1) + level
+
+
+class MerkleLog:
+    """
+    基于节点文件的只追加 Merkle 日志。
+    - append(data) / extend(datas)：追加叶子数据；append_hash / extend_hashes 直接追加叶子哈希；
+    - root(tree_size=None)、inclusion_proof(index, tree_size=None)、consistency_proof(old_size, new_size=None)
+      与 merkle.MerkleTree 的接口与结果一致，tree_size 可以是任意历史大小。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "a+b")
+        records = os.fstat(self._file.fileno()).st_size // HASH_SIZE
+        # 由记录数反推叶子数：f(n) 单调递增，取 f(n) <= records 的最大 n
+        lo, hi = 0, records
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if _forest_nodes(mid) <= records:
+                lo = mid
+            else:
+                hi = mid - 1
+        self._size = lo
+        if _forest_nodes(lo) * HASH_SIZE != os.fstat(self._file.fileno()).st_size:
+            self._file.truncate(_forest_nodes(lo) * HASH_SIZE)
+        self._frontier: List[bytes] = []
+        start = 0
+        for level in range(self._size.bit_length() - 1, -1, -1):
+            if self._size >> level & 1:
+                self._frontier.append(self._read(_node_pos(level, start >> level)))
+                start += 1 << level
+
+    @property
+    def size(self) -> int:
+        """叶子个数。"""
+        return self._size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _read(self, pos: int) -> bytes:
+        self._file.seek(pos * HASH_SIZE)
+        h = self._file.read(HASH_SIZE)
+        if len(h) != HASH_SIZE:
+            raise IOError("节点文件损坏: %s" % self.path)
+        return h
+
+    def _append_level_hashes(self, hashes: bytes) -> None:
+        """
+        追加首尾相接的叶子哈希：逐层批量计算新完成的满子树节点（每层一次 _hash_pairs），
+        再按后序写入文件，并更新边界。
+        """
+        n = self._size
+        count = len(hashes) // HASH_SIZE
+        if count == 0:
+            return
+        # 边界上各高度的子树根：n 的第 l 位为 1 时，高度 l 的子树序号为 (n >> l) - 1
+        old = {}
+        i = 0
+        for level in range(n.bit_length() - 1, -1, -1):
+            if n >> level & 1:
+                old[level] = self._frontier[i]
+                i += 1
+
+        new_levels: List[Tuple[int, bytes]] = []    # 每个高度上新完成节点的 (起始序号, 首尾相接的哈希)
+        first, cur = n, bytes(hashes)
+        level = 0
+        while cur:
+            new_levels.append((first, cur))
+            if first & 1:
+                cur = old[level] + cur
+                first -= 1
+            cur = _hash_pairs(cur, len(cur) // (2 * HASH_SIZE))
+            first >>= 1
+            level += 1
+
+        out = bytearray()
+        for j in range(n, n + count):
+            level, index = 0, j
+            while True:
+                start, level_hashes = new_levels[level]
+                off = (index - start) * HASH_SIZE
+                out += level_hashes[off:off + HASH_SIZE]
+                if not index & 1:
+                    break
+                level += 1
+                index >>= 1
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(out)
+
+        size = n + count
+        frontier: List[bytes] = []
+        for level in range(size.bit_length() - 1, -1, -1):
+            if size >> level & 1:
+                index = (size >> level) - 1
+                if level < len(new_levels) and index >= new_levels[level][0]:
+                    start, level_hashes = new_levels[level]
+                    off = (index - start) * HASH_SIZE
+                    frontier.append(level_hashes[off:off + HASH_SIZE])
+                else:
+                    frontier.append(old[level])
+        self._frontier = frontier
+        self._size = size
+
+    def append_hash(self, h: bytes) -> int:
+        """追加一个叶子哈希，返回其序号。"""
+        return self.extend_hashes([h])
+
+    def extend_hashes(self, hashes: Iterable[bytes]) -> int:
+        """追加若干叶子哈希（每个 32 字节），一次写入文件；返回第一个新叶子的序号。"""
+        first = self._size
+        buf = bytearray()
+        for h in hashes:
+            if len(h) != HASH_SIZE:
+                raise ValueError("叶子哈希必须为 32 字节")
+            buf += h
+            if len(buf) == APPEND_BATCH_SIZE * HASH_SIZE:
+                self._append_level_hashes(buf)
+                buf.clear()
+        self._append_level_hashes(buf)
+        return first
+
+    def append(self, data: bytes) -> int:
+        """追加一条叶子数据，返回其序号。"""
+        return self.extend_hashes([leaf_hash(data)])
+
+    def extend(self, datas: Iterable[bytes]) -> int:
+        """追加若干叶子数据（叶子哈希按批批量计算），返回第一个新叶子的序号。"""
+        first = self._size
+        batch: List[bytes] = []
+        for d in datas:
+            batch.append(d)
+            if len(batch) == APPEND_BATCH_SIZE:
+                self._append_level_hashes(_hash_leaves(batch))
+                batch.clear()
+        if batch:
+            self._append_level_hashes(_hash_leaves(batch))
+        return first
+
+    def leaf(self, index: int) -> bytes:
+        """第 index 个叶子的哈希。"""
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return self._read(_node_pos(0, index))
+
+    def root(self, tree_size: Optional[int] = None) -> bytes:
+        """前 tree_size 个叶子构成的树的根（缺省为当前大小，直接由边界计算）。"""
+        if tree_size is None or tree_size == self._size:
+            if not self._frontier:
+                return EMPTY_ROOT
+            r = self._frontier[-1]
+            for h in reversed(self._frontier[:-1]):
+                r = node_hash(h, r)
+            return r
+        if not 0 <= tree_size <= self._size:
+            raise ValueError("tree_size 超出范围")
+        if tree_size == 0:
+            return EMPTY_ROOT
+        return self._subtree_hash(0, tree_size)
+
+    def _subtree_hash(self, start: int, end: int) -> bytes:
+        """MTH(D[start:end])：对齐的满子树直接从文件读取，否则在 k 处拆分后组合。"""
+        n = end - start
+        if n & (n - 1) == 0 and start % n == 0:
+            level = n.bit_length() - 1
+            return self._read(_node_pos(level, start >> level))
+        k = _split(n)
+        return node_hash(self._subtree_hash(start, start + k), self._subtree_hash(start + k, end))
+
+    def inclusion_proof(self, index: int, tree_size: Optional[int] = None) -> List[bytes]:
+        """叶子 index 在前 tree_size 个叶子构成的树中的存在性证明，由叶向根排列。"""
+        n = self._size if tree_size is None else tree_size
+        if not 0 <= index < n <= self._size:
+            raise ValueError("index 或 tree_size 超出范围")
+        return _inclusion_path(self._subtree_hash, index, n)
+
+    def consistency_proof(self, old_size: int, new_size: Optional[int] = None) -> List[bytes]:
+        """大小 old_size 与 new_size（缺省为当前大小）两棵树之间的一致性证明。"""
+        n = self._size if new_size is None else new_size
+        if not 0 <= old_size <= n <= self._size:
+            raise ValueError("old_size 或 new_size 超出范围")
+        return _consistency_path(self._subtree_hash, old_size, n)
+
+    def flush(self) -> None:
+        """把已追加的节点写入磁盘。"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "MerkleLog":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
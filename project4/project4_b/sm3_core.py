@@ -2,10 +2,15 @@
 SM3 核心实现，支持：
 - 自定义初始向量（IV）
 - 传入 total_bytes_prefix 以便进行“长度扩展攻击”的连续压缩
+- hashlib 风格的增量哈希对象 SM3（update/copy/digest/hexdigest），常量内存处理大文件与数据流
 
-所有输入/输出均使用 Python 内置类型（bytes/str/int）。
+所有输入/输出均使用 Python 内置类型（bytes/str/int）；消息数据可以是任意支持缓冲区协议的对象
+（bytes/bytearray/memoryview/mmap），完整分组直接从缓冲区解码，不做整体复制。
 """
 from __future__ import annotations
+import mmap
+import os
+import struct
 from typing import List, Optional, Tuple
 
 # GB/T 32905-2016（SM3）中的默认初始向量
@@ -19,6 +24,8 @@ T_J: List[int] = [0x79CC4519] * 16 + [0x7A879D8A] * 48
 
 MASK_32 = 0xFFFFFFFF
 
+_UNPACK_BLOCK = struct.Struct(">16I").unpack_from
+
 def rotl32(x: int, n: int) -> int:
     """32 位循环左移。"""
     n = n & 31
@@ -68,11 +75,6 @@ def _pad_message(total_len_bytes_before_padding: int) -> bytes:
     pad.extend(bit_len.to_bytes(8, byteorder="big"))
     return bytes(pad)
 
-def _message_blocks(msg: bytes) -> List[bytes]:
-    """将消息按 64 字节切分为分组。"""
-    assert len(msg) % 64 == 0
-    return [msg[i:i+64] for i in range(0, len(msg), 64)]
-
 def _compress(v: List[int], block: bytes) -> List[int]:
     """压缩函数 CF，对单个 512-bit 分组进行消息扩展与 64 轮迭代。"""
     # 消息扩展
@@ -103,31 +105,148 @@ def _compress(v: List[int], block: bytes) -> List[int]:
 
     return [a ^ b for a, b in zip([A, B, C, D, E, F, G, H], v)]
 
+# 每轮使用的 T_j <<< (j mod 32)，预先算好
+T_J_ROT: List[int] = [rotl32(T_J[j], j) for j in range(64)]
+
+def _compress_fast(v: List[int], block: bytes, offset: int = 0) -> List[int]:
+    """
+    压缩函数 CF 的优化版本，结果与 _compress 相同（_compress 保留作参照实现）：
+    - 直接从缓冲区 block 的 offset 处按大端解包 16 个字（struct.unpack_from），不切片复制；W 在列表上原地扩展，W' = W[j] ^ W[j+4] 在轮内即时计算，不再单独分配 W1；
+    - 轮常量 T_j <<< j 预先算好（T_J_ROT）；
+    - 0–15 轮与 16–63 轮分为两个循环，FF/GG/P0 与循环左移全部内联为局部变量上的位运算，不做函数调用与 j 的范围判断。
+    """
+    M = MASK_32
+    W = list(_UNPACK_BLOCK(block, offset))
+    for j in range(16, 68):
+        x = W[j - 3]
+        x = W[j - 16] ^ W[j - 9] ^ ((x << 15 | x >> 17) & M)
+        y = W[j - 13]
+        W.append(x ^ ((x << 15 | x >> 17) & M) ^ ((x << 23 | x >> 9) & M) ^ ((y << 7 | y >> 25) & M) ^ W[j - 6])
+
+    A, B, C, D, E, F, G, H = v
+    T = T_J_ROT
+    for j in range(16):
+        a12 = (A << 12 | A >> 20) & M
+        ss1 = (a12 + E + T[j]) & M
+        ss1 = (ss1 << 7 | ss1 >> 25) & M
+        wj = W[j]
+        tt1 = ((A ^ B ^ C) + D + (ss1 ^ a12) + (wj ^ W[j + 4])) & M
+        tt2 = ((E ^ F ^ G) + H + ss1 + wj) & M
+        D = C
+        C = (B << 9 | B >> 23) & M
+        B = A
+        A = tt1
+        H = G
+        G = (F << 19 | F >> 13) & M
+        F = E
+        E = tt2 ^ ((tt2 << 9 | tt2 >> 23) & M) ^ ((tt2 << 17 | tt2 >> 15) & M)
+    for j in range(16, 64):
+        a12 = (A << 12 | A >> 20) & M
+        ss1 = (a12 + E + T[j]) & M
+        ss1 = (ss1 << 7 | ss1 >> 25) & M
+        wj = W[j]
+        tt1 = (((A & (B | C)) | (B & C)) + D + (ss1 ^ a12) + (wj ^ W[j + 4])) & M
+        tt2 = ((((F ^ G) & E) ^ G) + H + ss1 + wj) & M
+        D = C
+        C = (B << 9 | B >> 23) & M
+        B = A
+        A = tt1
+        H = G
+        G = (F << 19 | F >> 13) & M
+        F = E
+        E = tt2 ^ ((tt2 << 9 | tt2 >> 23) & M) ^ ((tt2 << 17 | tt2 >> 15) & M)
+
+    return [A ^ v[0], B ^ v[1], C ^ v[2], D ^ v[3], E ^ v[4], F ^ v[5], G ^ v[6], H ^ v[7]]
+
+class SM3:
+    """
+    hashlib 风格的增量 SM3 对象：update() / copy() / digest() / hexdigest()。
+    - 内部只缓存不足 64 字节的尾部，完整分组直接从输入压缩，不拼接、不复制整条消息；
+    - iv：可选初始向量（8 个 32 位无符号整数组成）。缺省使用标准 IV。
+    - total_bytes_prefix：在本对象的数据之前已经“视为参与哈希”的总字节数（用于长度扩展场景，影响最终填充中的长度域）。
+    """
+    name = "sm3"
+    digest_size = 32
+    block_size = 64
+
+    def __init__(self, data: bytes = b"", iv: Optional[List[int]] = None, total_bytes_prefix: int = 0) -> None:
+        if iv is None:
+            self._v = IV_DEFAULT.copy()
+        else:
+            if len(iv) != 8:
+                raise ValueError("iv 必须为 8 个 32 位无符号整数")
+            self._v = [x & MASK_32 for x in iv]
+        self._buf = bytearray()
+        self._length = total_bytes_prefix
+        if data:
+            self.update(data)
+
+    def update(self, data: bytes) -> None:
+        """追加数据，data 可为 bytes/bytearray/memoryview/mmap 等任意缓冲区对象。"""
+        with memoryview(data) as view, view.cast("B") as mv:
+            n = len(mv)
+            self._length += n
+            v = self._v
+            buf = self._buf
+            pos = 0
+            if buf:
+                pos = min(64 - len(buf), n)
+                buf += mv[:pos]
+                if len(buf) < 64:
+                    return
+                v = _compress_fast(v, buf)
+                buf.clear()
+            end = pos + ((n - pos) & ~63)
+            for off in range(pos, end, 64):
+                v = _compress_fast(v, mv, off)
+            buf += mv[end:]
+            self._v = v
+
+    def copy(self) -> "SM3":
+        """返回当前状态的独立副本（用于共享前缀后分别继续哈希）。"""
+        other = SM3.__new__(SM3)
+        other._v = self._v.copy()
+        other._buf = bytearray(self._buf)
+        other._length = self._length
+        return other
+
+    def digest(self) -> bytes:
+        """返回 32 字节摘要，不改变对象状态。"""
+        v = self._v
+        tail = self._buf + _pad_message(self._length)
+        for off in range(0, len(tail), 64):
+            v = _compress_fast(v, tail, off)
+        return b''.join(_u32_to_bytes_be(x) for x in v)
+
+    def hexdigest(self) -> str:
+        """返回摘要的十六进制小写字符串。"""
+        return self.digest().hex()
+
+
 def sm3_hash(data: bytes, iv: Optional[List[int]] = None, total_bytes_prefix: int = 0) -> str:
     """
     计算 SM3 摘要。
-    - data：本次要处理的数据（bytes）
+    - data：本次要处理的数据（bytes 或任意缓冲区对象，如 bytearray/memoryview/mmap）
     - iv：可选初始向量（8 个 32 位无符号整数组成）。缺省使用标准 IV。
     - total_bytes_prefix：在本次 data 之前已经“视为参与哈希”的总字节数（用于长度扩展场景，影响最终填充中的长度域）。
     返回：32 字节（256 bit）摘要的十六进制小写字符串。
     """
-    if iv is None:
-        v = IV_DEFAULT.copy()
-    else:
-        if len(iv) != 8:
-            raise ValueError("iv 必须为 8 个 32 位无符号整数")
-        v = [x & MASK_32 for x in iv]
-
-    # 构造当前回合的完整输入：data || pad(total_bytes_prefix + len(data))
-    total_len_before_pad = total_bytes_prefix + len(data)
-    pad = _pad_message(total_len_before_pad)
-    full = data + pad
-
-    for block in _message_blocks(full):
-        v = _compress(v, block)
-
-    digest_bytes = b''.join(_u32_to_bytes_be(x) for x in v)
-    return digest_bytes.hex()
+    return SM3(data, iv, total_bytes_prefix).hexdigest()
+
+def sm3_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    计算文件的 SM3 摘要（十六进制小写字符串）。
+    文件以只读 mmap 映射后按 chunk_size 分段送入 SM3 对象，由操作系统按需换入页面，不把整个文件读入内存。
+    """
+    h = SM3()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as mv:
+                for off in range(0, len(mv), chunk_size):
+                    h.update(mv[off:off + chunk_size])
+    return h.hexdigest()
 
 def parse_digest_to_iv(digest_hex: str) -> List[int]:
     """将 64 位十六进制 SM3 摘要解析为 8×32 位（大端）的 IV，用于继续压缩。"""
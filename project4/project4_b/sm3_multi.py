@@ -0,0 +1,140 @@
+"""
+SM3 多缓冲（multi-buffer）批量哈希，基于 NumPy：
+- 把 N 条独立消息按分组数归类，同一类消息填充后排成 (N, 分组数, 16) 的 uint32 数组；
+- 消息扩展与 64 轮迭代对 N 条消息“按通道并行”执行，每一步都是一次数组运算，
+  解释器开销由 N 条消息分摊，适合大量短记录（ID、Merkle 叶子等）的哈希。
+
+NumPy 为可选依赖，未安装时调用 sm3_hash_many 会抛出 ImportError。
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from sm3_core import IV_DEFAULT, T_J_ROT, _pad_message
+
+# 每批并行处理的最大消息数，限制消息扩展数组 W (68×N) 的内存占用
+DEFAULT_BATCH_SIZE = 1 << 15
+
+
+def _rotl(x, n: int):
+    """uint32 数组循环左移（0 < n < 32）。"""
+    return (x << np.uint32(n)) | (x >> np.uint32(32 - n))
+
+
+def _compress_many(v, block):
+    """对 N 条消息的当前分组并行执行压缩函数 CF。
+
+    v 为 8 个长度为 N 的 uint32 数组（各通道的链接变量），block 为 (16, N) 的 uint32 数组。
+    """
+    n = block.shape[1]
+    W = np.empty((68, n), dtype=np.uint32)
+    W[:16] = block
+    for j in range(16, 68):
+        x = W[j - 16] ^ W[j - 9] ^ _rotl(W[j - 3], 15)
+        W[j] = x ^ _rotl(x, 15) ^ _rotl(x, 23) ^ _rotl(W[j - 13], 7) ^ W[j - 6]
+    W1 = W[:64] ^ W[4:68]
+
+    A, B, C, D, E, F, G, H = v
+    for j in range(64):
+        A12 = _rotl(A, 12)
+        SS1 = _rotl(A12 + E + np.uint32(T_J_ROT[j]), 7)
+        SS2 = SS1 ^ A12
+        if j < 16:
+            ff = A ^ B ^ C
+            gg = E ^ F ^ G
+        else:
+            ff = (A & B) | (A & C) | (B & C)
+            gg = (E & F) | (~E & G)
+        TT1 = ff + D + SS2 + W1[j]
+        TT2 = gg + H + SS1 + W[j]
+        D = C
+        C = _rotl(B, 9)
+        B = A
+        A = TT1
+        H = G
+        G = _rotl(F, 19)
+        F = E
+        E = TT2 ^ _rotl(TT2, 9) ^ _rotl(TT2, 17)
+
+    return [x ^ y for x, y in zip([A, B, C, D, E, F, G, H], v)]
+
+
+def _digest_words(words) -> bytes:
+    """对 (N, 分组数, 16) 的已填充 uint32 数组逐分组并行压缩，返回 N 个摘要首尾相接的 bytes。"""
+    n, nblocks, _ = words.shape
+    v = [np.full(n, x, dtype=np.uint32) for x in IV_DEFAULT]
+    for b in range(nblocks):
+        v = _compress_many(v, np.ascontiguousarray(words[:, b, :].T))
+    return np.stack(v, axis=1).astype('>u4').tobytes()
+
+
+def _hash_group(msgs: List[bytes], nblocks: int) -> List[bytes]:
+    """对分组数相同的一批消息并行哈希，返回 32 字节摘要列表。"""
+    n = len(msgs)
+    buf = b''.join(m + _pad_message(len(m)) for m in msgs)
+    words = np.frombuffer(buf, dtype='>u4').astype(np.uint32).reshape(n, nblocks, 16)
+    digests = _digest_words(words)
+    return [digests[i * 32:(i + 1) * 32] for i in range(n)]
+
+
+def sm3_digest_many(messages: Iterable[bytes], batch_size: int = DEFAULT_BATCH_SIZE) -> List[bytes]:
+    """
+    批量计算 SM3 摘要。
+    - messages：若干条 bytes 消息，长度可以各不相同
+    - batch_size：每次并行处理的最大消息数
+    返回：与输入一一对应的 32 字节摘要列表，结果与逐条调用 SM3(m).digest() 相同。
+    长度不同的消息按填充后的分组数归类，每类内部并行压缩。
+    """
+    if np is None:
+        raise ImportError("sm3_digest_many 需要安装 numpy")
+    msgs = [bytes(m) for m in messages]
+    groups: Dict[int, List[int]] = {}
+    for i, m in enumerate(msgs):
+        groups.setdefault((len(m) + 72) // 64, []).append(i)
+
+    out: List[bytes] = [b''] * len(msgs)
+    for nblocks, idx in groups.items():
+        for start in range(0, len(idx), batch_size):
+            part = idx[start:start + batch_size]
+            for i, h in zip(part, _hash_group([msgs[i] for i in part], nblocks)):
+                out[i] = h
+    return out
+
+
+def sm3_hash_many(messages: Iterable[bytes], batch_size: int = DEFAULT_BATCH_SIZE) -> List[str]:
+    """sm3_digest_many 的十六进制版本：返回与输入一一对应的十六进制小写摘要列表，结果与逐条调用 sm3_hash 相同。"""
+    if np is None:
+        raise ImportError("sm3_hash_many 需要安装 numpy")
+    return [d.hex() for d in sm3_digest_many(messages, batch_size)]
+
+
+def sm3_digest_fixed(data: bytes, msg_len: int, prefix: bytes = b"", batch_size: int = DEFAULT_BATCH_SIZE) -> bytes:
+    """
+    对 data 中首尾相接、长度均为 msg_len 的若干条消息批量计算 SM3(prefix || 消息)。
+    返回各摘要首尾相接的 bytes（每条 32 字节）。所有消息的填充相同，打包与填充全部由数组运算完成，
+    不为每条消息创建 Python 对象，适合 Merkle 树逐层哈希（prefix = 0x01，msg_len = 64）。
+    """
+    if np is None:
+        raise ImportError("sm3_digest_fixed 需要安装 numpy")
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if len(raw) % msg_len:
+        raise ValueError("data 长度必须是 msg_len 的整数倍")
+    n = len(raw) // msg_len
+    total = len(prefix) + msg_len
+    pad = np.frombuffer(_pad_message(total), dtype=np.uint8)
+    width = total + len(pad)
+    head = np.frombuffer(prefix, dtype=np.uint8)
+
+    out = bytearray()
+    for start in range(0, n, batch_size):
+        cnt = min(batch_size, n - start)
+        buf = np.empty((cnt, width), dtype=np.uint8)
+        buf[:, :len(prefix)] = head
+        buf[:, len(prefix):total] = raw[start * msg_len:(start + cnt) * msg_len].reshape(cnt, msg_len)
+        buf[:, total:] = pad
+        out += _digest_words(buf.view('>u4').astype(np.uint32).reshape(cnt, width // 64, 16))
+    return bytes(out)
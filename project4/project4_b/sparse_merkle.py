@@ -0,0 +1,213 @@
+"""
+基于 SM3 的稀疏 Merkle 树（键值映射），支持存在性与不存在性证明：
+- 键 k 的路径为 SM3(k) 的 256 个比特（由高到低），值只以 SM3(v) 参与计算；
+- 叶子哈希 SM3(0x00 || 路径 || SM3(v))，内部节点哈希 SM3(0x01 || 左 || 右)，与 merkle.py 使用相同的域分离；
+- 只含一个键的子树直接由该叶子表示（叶子放在与其他键分叉的深度上），树高约为 log2(n)，而不是固定的 256 层；
+- 空子树的哈希按深度预先算好：EMPTY_HASHES[256] = 32 字节全 0，EMPTY_HASHES[d] = H(EMPTY_HASHES[d+1], EMPTY_HASHES[d+1])；
+- 节点以堆式编号（根为 1，子节点为 2i、2i+1）保存在字典中，空子树不占存储。
+
+不存在性证明有两种情形：查询路径走到空子树（以该深度的空子树哈希为起点），
+或走到另一个键的叶子（给出该叶子的路径与值哈希，其路径与查询路径在该深度之前一致、之后不同）。
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sm3_core import SM3
+from merkle import HASH_SIZE, LEAF_PREFIX, NODE_PREFIX, node_hash, np, _hash_pairs
+
+try:
+    from sm3_multi import sm3_digest_many
+except ImportError:
+    pass
+
+DEPTH = 256
+
+EMPTY_HASHES: List[bytes] = [b""] * DEPTH + [bytes(HASH_SIZE)]
+for _d in range(DEPTH - 1, -1, -1):
+    EMPTY_HASHES[_d] = node_hash(EMPTY_HASHES[_d + 1], EMPTY_HASHES[_d + 1])
+del _d
+
+# 证明：(由叶向根排列的兄弟节点哈希, 终点处的叶子 (路径, 值哈希)；终点为空子树时为 None)
+SparseProof = Tuple[List[bytes], Optional[Tuple[bytes, bytes]]]
+
+
+def _digest_all(messages: Sequence[bytes]) -> List[bytes]:
+    """批量 SM3，安装 NumPy 时使用多缓冲实现。"""
+    if np is not None:
+        return sm3_digest_many(messages)
+    return [SM3(m).digest() for m in messages]
+
+
+def key_path(key: bytes) -> bytes:
+    """键在树中的路径 SM3(key)。"""
+    return SM3(key).digest()
+
+
+def sparse_leaf_hash(path: bytes, value_hash: bytes) -> bytes:
+    """叶子哈希 SM3(0x00 || path || value_hash)。"""
+    return SM3(LEAF_PREFIX + path + value_hash).digest()
+
+
+def _bit(path: int, depth: int) -> int:
+    """路径第 depth 个比特（由高位起）。"""
+    return (path >> (DEPTH - 1 - depth)) & 1
+
+
+class SparseMerkleTree:
+    """
+    稀疏 Merkle 树。
+    - update(items)：批量插入/更新键值，先完成所有结构调整，再按深度由深到浅逐层批量重算被触及的节点，
+      每个节点在一批中只哈希一次；
+    - prove(key) / prove_many(keys)：生成存在性或不存在性证明，只做字典查找，不做哈希（键路径除外）；
+    - verify_sparse(root, key, value, proof)：value 为 None 时验证键不存在。
+    """
+
+    def __init__(self, items: Optional[Mapping[bytes, bytes]] = None) -> None:
+        self._hashes: Dict[int, bytes] = {}                # 非空节点的哈希
+        self._leaves: Dict[int, Tuple[int, bytes]] = {}    # 叶子节点 -> (路径整数, 值哈希)
+        if items:
+            self.update(items)
+
+    def __len__(self) -> int:
+        return len(self._leaves)
+
+    def root(self) -> bytes:
+        return self._hashes.get(1, EMPTY_HASHES[0])
+
+    def _node_hash(self, node: int) -> bytes:
+        h = self._hashes.get(node)
+        if h is None:
+            return EMPTY_HASHES[node.bit_length() - 1]
+        return h
+
+    def update(self, items: Mapping[bytes, bytes]) -> None:
+        """批量插入或更新键值对（bytes -> bytes）。"""
+        keys = list(items)
+        if not keys:
+            return
+        paths = _digest_all(keys)
+        value_hashes = _digest_all([items[k] for k in keys])
+
+        touched: List[set] = [set() for _ in range(DEPTH)]  # 每个深度上需要重算的内部节点
+        new_leaves: Dict[int, None] = {}
+        leaves, hashes = self._leaves, self._hashes
+        for path_bytes, vh in zip(paths, value_hashes):
+            path = int.from_bytes(path_bytes, "big")
+            node, d = 1, 0
+            while True:
+                leaf = leaves.get(node)
+                if leaf is not None:
+                    if leaf[0] == path:
+                        leaves[node] = (path, vh)
+                        new_leaves[node] = None
+                        break
+                    # 与已有叶子共享前缀：把旧叶子下推到两者分叉的深度
+                    other = leaf[0]
+                    del leaves[node]
+                    new_leaves.pop(node, None)
+                    while _bit(path, d) == _bit(other, d):
+                        hashes[node] = b""
+                        touched[d].add(node)
+                        node = 2 * node + _bit(path, d)
+                        d += 1
+                    hashes[node] = b""
+                    touched[d].add(node)
+                    moved = 2 * node + _bit(other, d)
+                    leaves[moved] = leaf
+                    new_leaves[moved] = None
+                    node = 2 * node + _bit(path, d)
+                    leaves[node] = (path, vh)
+                    new_leaves[node] = None
+                    break
+                if node in hashes:
+                    touched[d].add(node)
+                    node = 2 * node + _bit(path, d)
+                    d += 1
+                    continue
+                leaves[node] = (path, vh)
+                new_leaves[node] = None
+                break
+
+        # 叶子哈希：SM3(0x00 || 路径 || 值哈希)，消息等长，一次批量计算
+        nodes = list(new_leaves)
+        buf = b"".join(leaves[n][0].to_bytes(HASH_SIZE, "big") + leaves[n][1] for n in nodes)
+        digests = _hash_pairs(buf, len(nodes), LEAF_PREFIX)
+        for i, n in enumerate(nodes):
+            hashes[n] = digests[i * HASH_SIZE:(i + 1) * HASH_SIZE]
+
+        # 内部节点：由深到浅逐层批量重算
+        for d in range(DEPTH - 1, -1, -1):
+            if not touched[d]:
+                continue
+            nodes = list(touched[d])
+            buf = b"".join(self._node_hash(2 * n) + self._node_hash(2 * n + 1) for n in nodes)
+            digests = _hash_pairs(buf, len(nodes), NODE_PREFIX)
+            for i, n in enumerate(nodes):
+                hashes[n] = digests[i * HASH_SIZE:(i + 1) * HASH_SIZE]
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        """返回键对应的值哈希 SM3(v)，键不存在时返回 None。"""
+        path = int.from_bytes(key_path(key), "big")
+        node, d = 1, 0
+        while node in self._hashes:
+            leaf = self._leaves.get(node)
+            if leaf is not None:
+                return leaf[1] if leaf[0] == path else None
+            node = 2 * node + _bit(path, d)
+            d += 1
+        return None
+
+    def _prove_path(self, path_bytes: bytes) -> SparseProof:
+        path = int.from_bytes(path_bytes, "big")
+        siblings: List[bytes] = []
+        node, d = 1, 0
+        leaves, hashes = self._leaves, self._hashes
+        while node in hashes:
+            leaf = leaves.get(node)
+            if leaf is not None:
+                siblings.reverse()
+                return siblings, (leaf[0].to_bytes(HASH_SIZE, "big"), leaf[1])
+            b = _bit(path, d)
+            siblings.append(self._node_hash(2 * node + 1 - b))
+            node = 2 * node + b
+            d += 1
+        siblings.reverse()
+        return siblings, None
+
+    def prove(self, key: bytes) -> SparseProof:
+        """键 key 的存在性或不存在性证明。"""
+        return self._prove_path(key_path(key))
+
+    def prove_many(self, keys: Iterable[bytes]) -> List[SparseProof]:
+        """批量生成证明，键路径一次批量哈希。"""
+        return [self._prove_path(p) for p in _digest_all(list(keys))]
+
+
+def verify_sparse(root: bytes, key: bytes, value: Optional[bytes], proof: SparseProof) -> bool:
+    """
+    验证证明：value 为 bytes 时验证 key -> value 存在于根为 root 的树中，value 为 None 时验证 key 不存在。
+    """
+    siblings, leaf = proof
+    depth = len(siblings)
+    if depth > DEPTH:
+        return False
+    path_bytes = key_path(key)
+    path = int.from_bytes(path_bytes, "big")
+    if value is not None:
+        if leaf is None or leaf != (path_bytes, SM3(value).digest()):
+            return False
+        h = sparse_leaf_hash(*leaf)
+    elif leaf is None:
+        h = EMPTY_HASHES[depth]
+    else:
+        other = int.from_bytes(leaf[0], "big")
+        # 另一个键的叶子：须与查询路径共享前 depth 个比特且不是同一个键
+        if other == path or (other ^ path) >> (DEPTH - depth) != 0:
+            return False
+        h = sparse_leaf_hash(*leaf)
+    for i, sib in enumerate(siblings):
+        if _bit(path, depth - 1 - i):
+            h = node_hash(sib, h)
+        else:
+            h = node_hash(h, sib)
+    return h == root
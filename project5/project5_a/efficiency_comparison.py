@@ -4,8 +4,12 @@ SM2效率对比测试 - 简单版本
 """
 
 import time
+import random
+import tracemalloc
+import inverse_backend
 from sm2 import encry_sm2 as original_encry, decry_sm2 as original_decry, get_args, get_key
-from sm2_optimized import encry_sm2 as optimized_encry, decry_sm2 as optimized_decry, precompute_points
+from sm2_optimized import encry_sm2 as optimized_encry, decry_sm2 as optimized_decry, precompute_points, \
+    get_fixed_base_table, precompute_fixed_base, COMB_W
 
 def simple_efficiency_test():
     """简单效率对比测试"""
@@ -19,9 +23,9 @@ def simple_efficiency_test():
     # 测试消息
     message = "Hello, SM2效率测试!"
     
-    # 预计算优化算法的表
+    # 预计算优化算法的表（基点G的梳状表每个进程只构建一次）
     p, a, *_ = args
-    precomputed_G = precompute_points(args[4], 4, p, a)
+    get_fixed_base_table(args)
     precomputed_PB = precompute_points(PB, 4, p, a)
     
     # 测试原始算法
@@ -35,7 +39,7 @@ def simple_efficiency_test():
     # 测试优化算法
     print("\n测试优化算法...")
     start_time = time.time()
-    ciphertext2 = optimized_encry(args, PB, message, precomputed_G, precomputed_PB)
+    ciphertext2 = optimized_encry(args, PB, message, precomputed_PB=precomputed_PB)
     decrypted2 = optimized_decry(args, dB, ciphertext2)
     optimized_time = time.time() - start_time
     print(f"优化算法时间: {optimized_time:.6f} 秒")
@@ -49,5 +53,51 @@ def simple_efficiency_test():
     print(f"原始算法: {'成功' if message == decrypted1 else '失败'}")
     print(f"优化算法: {'成功' if message == decrypted2 else '失败'}")
 
+def inverse_backend_test(rounds=2000):
+    """对比各模逆后端的耗时"""
+    print("\n模逆后端对比")
+    print("=" * 40)
+    p = get_args()[0]
+    values = [random.randrange(1, p) for _ in range(rounds)]
+    for name, inverse in inverse_backend.INVERSE_BACKENDS.items():
+        start_time = time.time()
+        for x in values:
+            inverse(x, p)
+        elapsed = (time.time() - start_time) / rounds
+        print(f"{name:8s}: {elapsed * 1e6:.2f} 微秒/次")
+    print(f"当前后端: {inverse_backend.backend_name}")
+
+def ladder_test(rounds=50):
+    """对比解密时wNAF与Co-Z Montgomery阶梯两种标量乘法的耗时及波动"""
+    print("\n解密标量乘法对比（wNAF vs Co-Z阶梯）")
+    print("=" * 40)
+    args = get_args()
+    PB, dB = get_key()
+    ciphertexts = [optimized_encry(args, PB, "ladder test %d" % i) for i in range(rounds)]
+    for method in ('wnaf', 'ladder'):
+        times = []
+        for C in ciphertexts:
+            start_time = time.perf_counter()
+            optimized_decry(args, dB, C, method=method)
+            times.append(time.perf_counter() - start_time)
+        mean = sum(times) / rounds
+        std = (sum((t - mean) ** 2 for t in times) / rounds) ** 0.5
+        print(f"{method:6s}: 平均 {mean * 1e3:.3f} 毫秒, 标准差 {std * 1e3:.3f} 毫秒")
+
+def table_memory_test():
+    """统计基点G梳状表（w=COMB_W）的内存占用"""
+    print("\n预计算表内存占用")
+    print("=" * 40)
+    p, a, _, _, G, n = get_args()
+    tracemalloc.start()
+    table = precompute_fixed_base(G, p, a, COMB_W, n.bit_length())
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    entries = sum(len(row) for row in table)
+    print(f"梳状表 w={COMB_W}: {entries} 个表项, 占用 {current / 1024:.1f} KB, 构建峰值 {peak / 1024:.1f} KB")
+
 if __name__ == '__main__':
-    simple_efficiency_test() 
\ No newline at end of file
+    simple_efficiency_test()
+    inverse_backend_test()
+    ladder_test()
+    table_memory_test()
\ No newline at end of file
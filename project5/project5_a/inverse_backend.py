@@ -0,0 +1,41 @@
+"""
+模逆运算后端，sm2.py 与 sm2_optimized.py 共用
+- builtin: pow(x, -1, m)，Python 3.8+ 内置的C实现扩展欧几里得
+- fermat:  pow(x, m-2, m)，费马小定理，仅适用于素数模
+- gmpy2:   gmpy2.invert，安装 gmpy2 时可用
+
+导入时自动选择最快的可用后端（gmpy2 > builtin），可通过 set_inverse_backend 切换以便测试对比。
+"""
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+def inverse_builtin(x, m):
+    return pow(x, -1, m)
+
+
+def inverse_fermat(x, m):
+    return pow(x, m - 2, m)
+
+
+def inverse_gmpy2(x, m):
+    return int(gmpy2.invert(x, m))
+
+
+INVERSE_BACKENDS = {'builtin': inverse_builtin, 'fermat': inverse_fermat}
+if gmpy2 is not None:
+    INVERSE_BACKENDS['gmpy2'] = inverse_gmpy2
+
+backend_name = 'gmpy2' if gmpy2 is not None else 'builtin'
+inverse = INVERSE_BACKENDS[backend_name]
+
+
+def set_inverse_backend(name):
+    """切换模逆后端，name 取 INVERSE_BACKENDS 中的键"""
+    global backend_name, inverse
+    if name not in INVERSE_BACKENDS:
+        raise ValueError("未知或不可用的模逆后端: %s" % name)
+    backend_name = name
+    inverse = INVERSE_BACKENDS[name]
@@ -1,6 +1,8 @@
 import random
-from math import gcd, ceil, log
+from math import ceil, log
 from gmssl import sm3
+import inverse_backend
+from sm3_context import SM3Context
 
 # =================== 数据类型转换 ===================
 def int_to_bytes(x, k):
@@ -75,26 +77,24 @@ def fielde_to_hex(e):
 def KDF(Z, klen):
     """密钥派生函数，基于SM3哈希算法"""
     v, ct, l = 256, 1, (klen + 255) // 256
+    prefix = SM3Context(bits_to_bytes(Z))  # Z只压缩一次，各计数器块从其中间状态继续
     Ha = []
     for _ in range(l):
-        s = Z + int_to_bits(ct).rjust(32, '0')
-        Ha.append(hex_to_bits(sm3.sm3_hash([i for i in bits_to_bytes(s)])))
+        h = prefix.copy()
+        h.update(bits_to_bytes(int_to_bits(ct).rjust(32, '0')))
+        Ha.append(bytes_to_bits(h.digest()))
         ct += 1
     k = ''.join(Ha)
     return k[:klen]
 
 def calc_inverse(M, m):
-    """计算模逆元"""
-    if gcd(M, m) != 1: return None
-    u1, u2, u3, v1, v2, v3 = 1, 0, M, 0, 1, m
-    while v3:
-        q = u3 // v3
-        u1, u2, u3, v1, v2, v3 = v1, v2, v3, u1 - q * v1, u2 - q * v2, u3 - q * v3
-    return u1 % m
+    """计算模逆元（m为素数，具体实现由 inverse_backend 选择）"""
+    M %= m
+    if M == 0: return None
+    return inverse_backend.inverse(M, m)
 
 def frac_to_int(up, down, p):
     """将分数转换为模p下的整数"""
-    up, down = up // gcd(up, down), down // gcd(up, down)
     return up * calc_inverse(down, p) % p
 
 def add_point(P, Q, p):
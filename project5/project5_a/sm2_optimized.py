@@ -1,6 +1,10 @@
-import random
-from math import gcd, ceil, log
+import secrets
+import threading
+from collections import OrderedDict
+from math import ceil, log
 from gmssl import sm3
+import inverse_backend
+from sm3_context import SM3Context
 
 
 # =================== 数据类型转换 ===================
@@ -74,32 +78,79 @@ def fielde_to_hex(e):
 
 
 def KDF(Z, klen):
-    v, ct, l = 256, 1, (klen + 255) // 256
-    Ha = []
-    for _ in range(l):
-        s = Z + int_to_bits(ct).rjust(32, '0')
-        Ha.append(hex_to_bits(sm3.sm3_hash([i for i in bits_to_bytes(s)])))
-        ct += 1
-    k = ''.join(Ha)
-    return k[:klen]
+    return bytes_to_bits(KDF_bytes(bits_to_bytes(Z), (klen + 7) // 8))[:klen]
+
+
+def sm3_digest(data):
+    """SM3摘要，输入输出均为bytes"""
+    return bytes.fromhex(sm3.sm3_hash(bytearray(data)))
+
+
+def KDF_bytes(Z, klen):
+    """字节版KDF：Z为bytes，klen为输出字节数
+
+    Z 只压缩一次并保存SM3中间状态，每个计数器块从该状态的副本继续，
+    Z = x2||y2 恰为一个64字节分组时，每32字节输出只需一次压缩（原为两次）。
+    """
+    prefix = SM3Context(Z)
+    out = bytearray()
+    for ct in range(1, (klen + 31) // 32 + 1):
+        h = prefix.copy()
+        h.update(ct.to_bytes(4, 'big'))
+        out += h.digest()
+    return bytes(out[:klen])
+
+
+def xor_bytes(x, y):
+    """等长字节串按位异或"""
+    return (int.from_bytes(x, 'big') ^ int.from_bytes(y, 'big')).to_bytes(len(x), 'big')
+
+
+class KDFStream:
+    """增量KDF：按计数器逐块生成密钥流，read(n) 返回接下来的n字节"""
+
+    def __init__(self, Z):
+        self.prefix = SM3Context(Z)
+        self.ct = 1
+        self.buf = b''
+        self.length = 0
+        self.all_zero = True
+
+    def read(self, n):
+        blocks = [self.buf]
+        have = len(self.buf)
+        while have < n:
+            h = self.prefix.copy()
+            h.update(self.ct.to_bytes(4, 'big'))
+            block = h.digest()
+            self.ct += 1
+            blocks.append(block)
+            have += 32
+        out = b''.join(blocks)
+        self.buf = out[n:]
+        out = out[:n]
+        self.length += n
+        if self.all_zero and any(out):
+            self.all_zero = False
+        return out
 
 
 def calc_inverse(M, m):
-    if gcd(M, m) != 1: return None
-    u1, u2, u3, v1, v2, v3 = 1, 0, M, 0, 1, m
-    while v3:
-        q = u3 // v3
-        u1, u2, u3, v1, v2, v3 = v1, v2, v3, u1 - q * v1, u2 - q * v2, u3 - q * v3
-    return u1 % m
+    """计算模逆元（m为素数，具体实现由 inverse_backend 选择）"""
+    M %= m
+    if M == 0:
+        return None
+    return inverse_backend.inverse(M, m)
 
 
 def frac_to_int(up, down, p):
-    up, down = up // gcd(up, down), down // gcd(up, down)
     return up * calc_inverse(down, p) % p
 
 
 # =================== 优化部分 ===================
 class Point:
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x, y, z=1):
         self.x = x
         self.y = y
@@ -115,8 +166,38 @@ class Point:
         return (x_aff, y_aff)
 
 
+def batch_to_affine(points, p):
+    """Montgomery批量求逆：N个Jacobian坐标点只做一次模逆即全部转换为仿射坐标（约3(N-1)次额外模乘）"""
+    prefix = []
+    acc = 1
+    for P in points:
+        if P.z != 0:
+            acc = acc * P.z % p
+        prefix.append(acc)
+
+    inv = calc_inverse(acc, p)
+    result = [(0, 0)] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        P = points[i]
+        if P.z == 0:
+            continue
+        z_inv = inv * prefix[i - 1] % p if i else inv
+        inv = inv * P.z % p
+        z_inv2 = z_inv * z_inv % p
+        result[i] = (P.x * z_inv2 % p, P.y * z_inv2 % p * z_inv % p)
+    return result
+
+
+def normalize_points(points, p):
+    """批量规范化：将Jacobian坐标点转换为Z=1的形式（无穷远点保持不变），仅需一次模逆"""
+    affine = batch_to_affine(points, p)
+    return [P if P.z == 0 else Point(x, y, 1) for P, (x, y) in zip(points, affine)]
+
+
 def precompute_points(P, w, p, a):
-    """预计算固定基点的窗口表"""
+    """预计算固定基点的窗口表，table[i] = iP（i为奇数，1 <= i <= 2^w - 1），表项规范化为Z=1"""
+    if not 2 <= w <= 8:
+        raise ValueError("窗口宽度w须在2到8之间")
     table = [None] * (1 << w)
     table[0] = Point(0, 0, 0)  # 无穷远点
 
@@ -125,32 +206,111 @@ def precompute_points(P, w, p, a):
     twoP = double_point_jacobian(table[1], p, a)
     for i in range(3, 1 << w, 2):
         table[i] = add_points_jacobian(table[i - 2], twoP, p, a)
+    table[1::2] = normalize_points(table[1::2], p)
     return table
 
 
+def precompute_points_batch(points, w, p, a):
+    """为多个点同时构建窗口表，所有表项共用一次批量模逆完成规范化"""
+    if not 2 <= w <= 8:
+        raise ValueError("窗口宽度w须在2到8之间")
+    tables = []
+    for P in points:
+        table = [None] * (1 << w)
+        table[0] = Point(0, 0, 0)
+        table[1] = Point(P[0], P[1], 1)
+        twoP = double_point_jacobian(table[1], p, a)
+        for i in range(3, 1 << w, 2):
+            table[i] = add_points_jacobian(table[i - 2], twoP, p, a)
+        tables.append(table)
+    flat = normalize_points([P for table in tables for P in table[3::2]], p)
+    step = (1 << (w - 1)) - 1
+    for i, table in enumerate(tables):
+        table[3::2] = flat[i * step:(i + 1) * step]
+    return tables
+
+
 def double_point_jacobian(P, p, a):
-    """Jacobian坐标下的点倍乘"""
+    """Jacobian坐标下的点倍乘（4M+6S，Z²、Y²只计算一次）"""
+    if P.z == 0:
+        return P
+
+    X1, Y1, Z1 = P.x, P.y, P.z
+    XX = X1 * X1 % p
+    YY = Y1 * Y1 % p
+    ZZ = Z1 * Z1 % p
+    S = 4 * X1 * YY % p
+    M = (3 * XX + a * (ZZ * ZZ % p)) % p
+    X3 = (M * M - 2 * S) % p
+    Y3 = (M * (S - X3) - 8 * (YY * YY % p)) % p
+    Z3 = 2 * Y1 * Z1 % p
+    return Point(X3, Y3, Z3)
+
+
+def double_point_jacobian_repeat(P, m, p, a):
+    """连续m次倍点（修正Jacobian坐标）
+
+    a 不为 -3，无法用 3(X-Z²)(X+Z²) 化简，因此缓存 W = aZ⁴，
+    每次倍点后以 W' = 16Y⁴W 更新，首次之后每次倍点为 4M+4S。
+    """
+    if P.z == 0 or m == 0:
+        return P
+
+    X, Y, Z = P.x, P.y, P.z
+    ZZ = Z * Z % p
+    W = a * (ZZ * ZZ % p) % p
+    for _ in range(m):
+        XX = X * X % p
+        YY = Y * Y % p
+        YYYY = YY * YY % p
+        S = 4 * X * YY % p
+        M = (3 * XX + W) % p
+        X3 = (M * M - 2 * S) % p
+        Y, Z = (M * (S - X3) - 8 * YYYY) % p, 2 * Y * Z % p
+        W = 16 * YYYY * W % p
+        X = X3
+    return Point(X, Y, Z)
+
+
+def add_points_mixed(P, Q, p, a):
+    """混合坐标点加法：P为Jacobian坐标，Q为Z=1的仿射点（8M+3S）"""
     if P.z == 0:
+        return Q
+    if Q.z == 0:
         return P
 
-    # 倍点公式
     X1, Y1, Z1 = P.x, P.y, P.z
-    A = (3 * X1 * X1 + a * pow(Z1, 4, p)) % p
-    B = (4 * X1 * Y1 * Y1) % p
-    X3 = (A * A - 2 * B) % p
-    Y3 = (A * (B - X3) - 8 * pow(Y1, 4, p)) % p
-    Z3 = (2 * Y1 * Z1) % p
+    Z1Z1 = Z1 * Z1 % p
+    U2 = Q.x * Z1Z1 % p
+    S2 = Q.y * Z1 % p * Z1Z1 % p
+    H = (U2 - X1) % p
+    R = (S2 - Y1) % p
+    if H == 0:
+        if R != 0:
+            return Point(0, 0, 0)
+        return double_point_jacobian(P, p, a)
+
+    HH = H * H % p
+    HHH = H * HH % p
+    V = X1 * HH % p
+    X3 = (R * R - HHH - 2 * V) % p
+    Y3 = (R * (V - X3) - Y1 * HHH) % p
+    Z3 = Z1 * H % p
     return Point(X3, Y3, Z3)
 
 
 def add_points_jacobian(P, Q, p, a):
-    """Jacobian坐标下的点加法（混合坐标系）"""
+    """Jacobian坐标下的点加法，任一点Z=1时转为混合坐标加法"""
     if P.z == 0:
         return Q
     if Q.z == 0:
         return P
+    if Q.z == 1:
+        return add_points_mixed(P, Q, p, a)
+    if P.z == 1:
+        return add_points_mixed(Q, P, p, a)
 
-    # 混合加法公式
+    # 通用加法公式（12M+4S）
     X1, Y1, Z1 = P.x, P.y, P.z
     X2, Y2, Z2 = Q.x, Q.y, Q.z
 
@@ -192,47 +352,388 @@ def naf(k):
     return naf_rep[::-1]
 
 
-def mult_point_fixed(precomputed, k, p, a, w=4):
-    """使用预计算表和滑动窗口法的标量乘法"""
+def wnaf(k, w):
+    """计算标量的宽度为w的NAF表示（高位在前），非零位均为奇数且 |d| < 2^(w-1)"""
+    full, half = 1 << w, 1 << (w - 1)
+    digits = []
+    while k > 0:
+        if k & 1:
+            d = k & (full - 1)
+            if d >= half:
+                d -= full
+            k -= d
+        else:
+            d = 0
+        digits.append(d)
+        k >>= 1
+    return digits[::-1]
+
+
+def _wnaf_accumulate(digit_lists, tables, p, a):
+    """wNAF累加内核：在局部整数 X, Y, Z 上完成连续倍点与混合加法，循环中不创建Point对象
+
+    digit_lists 为等长的wNAF序列（高位在前），tables 为对应的奇数倍点表（表项Z=1），
+    多于一个序列时即为Straus交错。连续倍点使用修正Jacobian坐标缓存 W = aZ⁴（见 double_point_jacobian_repeat），
+    点加即 add_points_mixed 的公式。Z = 0 表示无穷远点。
+    """
+    pairs = list(zip(digit_lists, tables))
+    X = Y = Z = 0
+    run = 0
+    for i in range(len(digit_lists[0])):
+        run += 1
+        for digits, table in pairs:
+            d = digits[i]
+            if not d:
+                continue
+            if d > 0:
+                Q = table[d]
+                x2, y2 = Q.x, Q.y
+            else:
+                Q = table[-d]
+                x2, y2 = Q.x, p - Q.y
+            if Z == 0:
+                X, Y, Z = x2, y2, 1
+                run = 0
+                continue
+
+            if run:
+                ZZ = Z * Z % p
+                W = a * (ZZ * ZZ % p) % p
+                for _ in range(run):
+                    XX = X * X % p
+                    YY = Y * Y % p
+                    YYYY = YY * YY % p
+                    S = 4 * X * YY % p
+                    M = (3 * XX + W) % p
+                    X3 = (M * M - 2 * S) % p
+                    Y, Z = (M * (S - X3) - 8 * YYYY) % p, 2 * Y * Z % p
+                    W = 16 * YYYY * W % p
+                    X = X3
+                run = 0
+
+            Z1Z1 = Z * Z % p
+            H = (x2 * Z1Z1 - X) % p
+            R = (y2 * Z % p * Z1Z1 - Y) % p
+            if H == 0:
+                if R != 0:
+                    X = Y = Z = 0
+                else:
+                    D = double_point_jacobian(Point(X, Y, Z), p, a)
+                    X, Y, Z = D.x, D.y, D.z
+                continue
+            HH = H * H % p
+            HHH = H * HH % p
+            V = X * HH % p
+            X3 = (R * R - HHH - 2 * V) % p
+            Y = (R * (V - X3) - Y * HHH) % p
+            Z = Z * H % p
+            X = X3
+    return double_point_jacobian_repeat(Point(X, Y, Z), run, p, a)
+
+
+def mult_point_fixed(precomputed, k, p, a, w=None):
+    """使用奇数倍点预计算表和wNAF的标量乘法
+
+    precomputed 为 precompute_points(P, w, p, a) 的结果，存有 P, 3P, ..., (2^w - 1)P，
+    对应宽度为 w+1 的wNAF，每个非零位直接以 |d| 为下标查表，负位在线取反。
+    """
     if k == 0:
         return Point(0, 0, 0)
+    if w is None:
+        w = (len(precomputed) - 1).bit_length()
+    return _wnaf_accumulate([wnaf(k, w + 1)], [precomputed], p, a)
+
+
+def mult_point_shamir(table1, k1, table2, k2, p, a):
+    """Shamir/Straus交错法计算 k1·P1 + k2·P2
+
+    两个标量分别做wNAF（宽度由各自的奇数倍点表决定），共用同一条倍点链，
+    只需约 n 次倍点，而非两次独立标量乘法的 2n 次。
+    """
+    digits1 = wnaf(k1, (len(table1) - 1).bit_length() + 1)
+    digits2 = wnaf(k2, (len(table2) - 1).bit_length() + 1)
+    length = max(len(digits1), len(digits2))
+    digits1 = [0] * (length - len(digits1)) + digits1
+    digits2 = [0] * (length - len(digits2)) + digits2
+    if length == 0:
+        return Point(0, 0, 0)
+    return _wnaf_accumulate([digits1, digits2], [table1, table2], p, a)
 
-    # 使用NAF表示法
-    naf_rep = naf(k)
-    R = Point(0, 0, 0)
-    for i, digit in enumerate(naf_rep):
-        R = double_point_jacobian(R, p, a)
-        if digit != 0:
-            idx = abs(digit) // 2 * 2 - 1 if digit < 0 else digit
-            if idx < len(precomputed) and precomputed[idx]:
-                if digit > 0:
-                    R = add_points_jacobian(R, precomputed[idx], p, a)
-                else:
-                    # 负点取反
-                    neg_P = Point(precomputed[idx].x, -precomputed[idx].y % p, precomputed[idx].z)
-                    R = add_points_jacobian(R, neg_P, p, a)
-    return R
+
+def mult_point_var(Q, k, p, a, w=4):
+    """非固定点的标量乘法（Jacobian坐标+wNAF），临时构建奇数倍点表"""
+    if k == 0:
+        return Point(0, 0, 0)
+    return mult_point_fixed(precompute_points(Q, w, p, a), k, p, a, w)
+
+
+# =================== 固定基点梳状预计算 ===================
+COMB_W = 8
+BASE_WNAF_W = 7
+_FIXED_BASE_TABLES = {}
+
+
+def signed_window(k, w):
+    """将标量按w位分块重编码为有符号数字，每位 d ∈ [-2^(w-1), 2^(w-1))，低位在前"""
+    full, half, mask = 1 << w, 1 << (w - 1), (1 << w) - 1
+    digits = []
+    while k:
+        d = k & mask
+        if d >= half:
+            d -= full
+        digits.append(d)
+        k = (k - d) >> w
+    return digits
+
+
+def precompute_fixed_base(P, p, a, w=COMB_W, bits=256):
+    """预计算 table[i][j] = j·2^(w·i)·P (1 <= j <= 2^(w-1))，以仿射坐标(Z=1)存储"""
+    rows = (bits + w) // w  # 有符号重编码可能在最高位产生一位进位
+    half = 1 << (w - 1)
+    table = []
+    base = Point(P[0], P[1], 1)
+    for _ in range(rows):
+        row = [Point(0, 0, 0), base]
+        for j in range(2, half + 1):
+            row.append(add_points_jacobian(row[j - 1], base, p, a))
+        # 下一行的基点: 2^w·base = 2·(2^(w-1)·base)，与本行一起批量规范化
+        row.append(double_point_jacobian(row[half], p, a))
+        row[2:] = normalize_points(row[2:], p)
+        base = row.pop()
+        table.append(row)
+    return table
+
+
+def mult_point_comb(table, k, p, a, w=COMB_W):
+    """基于固定基点分块预计算表的标量乘法，全程无倍点运算，仅约 bits/w 次点加（在局部整数上完成混合加法）"""
+    X = Y = Z = 0
+    for i, digit in enumerate(signed_window(k, w)):
+        if digit > 0:
+            Q = table[i][digit]
+            x2, y2 = Q.x, Q.y
+        elif digit < 0:
+            Q = table[i][-digit]
+            x2, y2 = Q.x, p - Q.y
+        else:
+            continue
+        if Z == 0:
+            X, Y, Z = x2, y2, 1
+            continue
+
+        Z1Z1 = Z * Z % p
+        H = (x2 * Z1Z1 - X) % p
+        R = (y2 * Z % p * Z1Z1 - Y) % p
+        if H == 0:
+            if R != 0:
+                X = Y = Z = 0
+            else:
+                D = double_point_jacobian(Point(X, Y, Z), p, a)
+                X, Y, Z = D.x, D.y, D.z
+            continue
+        HH = H * H % p
+        HHH = H * HH % p
+        V = X * HH % p
+        X3 = (R * R - HHH - 2 * V) % p
+        Y = (R * (V - X3) - Y * HHH) % p
+        Z = Z * H % p
+        X = X3
+    return Point(X, Y, Z)
+
+
+def get_fixed_base_table(args, w=COMB_W):
+    """获取基点G的梳状预计算表，每个进程首次使用时构建并缓存于模块级"""
+    p, a, _, _, G, n = args
+    key = ('comb', p, a, G, w)
+    table = _FIXED_BASE_TABLES.get(key)
+    if table is None:
+        table = precompute_fixed_base(G, p, a, w, n.bit_length())
+        _FIXED_BASE_TABLES[key] = table
+    return table
+
+
+def set_fixed_base_table(args, table, w=COMB_W):
+    """安装已构建好的梳状表（如由父进程传入），跳过本进程的构建"""
+    p, a, _, _, G, _ = args
+    _FIXED_BASE_TABLES[('comb', p, a, G, w)] = table
+
+
+def get_base_wnaf_table(args, w=BASE_WNAF_W):
+    """获取基点G的奇数倍点表（供wNAF/Shamir交错使用），同样缓存于模块级"""
+    p, a, _, _, G, _ = args
+    key = ('wnaf', p, a, G, w)
+    table = _FIXED_BASE_TABLES.get(key)
+    if table is None:
+        table = precompute_points(G, w, p, a)
+        _FIXED_BASE_TABLES[key] = table
+    return table
 
 
-def mult_point_var(Q, k, p, a):
-    """非固定点的标量乘法（Jacobian坐标+NAF）"""
+def mult_base_point(args, k, w=COMB_W):
+    """计算 k·G（使用模块级缓存的固定基点表）"""
+    p, a, *_ = args
+    return mult_point_comb(get_fixed_base_table(args, w), k, p, a, w)
+
+
+# =================== Co-Z Montgomery阶梯 ===================
+def _xycz_add(X1, Y1, X2, Y2, p):
+    """Co-Z加法：P、Q共享Z，返回 P+Q 与重新缩放后的P（共享新的Z' = Z(X2-X1)）以及 X2-X1（5M+2S）"""
+    H = (X2 - X1) % p
+    C = H * H % p
+    W1 = X1 * C % p
+    W2 = X2 * C % p
+    A1 = Y1 * (W2 - W1) % p
+    R = Y2 - Y1
+    X3 = (R * R - W1 - W2) % p
+    Y3 = (R * (W1 - X3) - A1) % p
+    return X3, Y3, W1, A1, H
+
+
+def _xycz_addc(X1, Y1, X2, Y2, p):
+    """共轭Co-Z加法：P、Q共享Z，同时返回 P+Q 与 P-Q（共享新的Z' = Z(X2-X1)）以及 X2-X1（6M+3S）"""
+    H = (X2 - X1) % p
+    C = H * H % p
+    W1 = X1 * C % p
+    W2 = X2 * C % p
+    A1 = Y1 * (W2 - W1) % p
+    R = Y2 - Y1
+    X3 = (R * R - W1 - W2) % p
+    Y3 = (R * (W1 - X3) - A1) % p
+    R = Y2 + Y1
+    X4 = (R * R - W1 - W2) % p
+    Y4 = (-R * (W1 - X4) - A1) % p
+    return X3, Y3, X4, Y4, H
+
+
+def mult_point_ladder(Q, k, p, a, n):
+    """Co-Z Montgomery阶梯标量乘法，每一位固定执行一次共轭Co-Z加法和一次Co-Z加法（11M+5S）
+
+    标量先改写为 k + 2n 或 k + n，使其比特长度恒为 n.bit_length() + 1 且最高位为1，
+    迭代次数与各位取值无关；两个寄存器通过下标 b / 1-b 选取，不按位分支选择运算。
+    k = 1、n-2、n-1 时阶梯中间值会出现无穷远点，Co-Z公式不适用，这几个平凡标量改用wNAF计算。
+    """
+    k %= n
     if k == 0:
         return Point(0, 0, 0)
+    if k == 1 or k >= n - 2:
+        return mult_point_var(Q, k, p, a)
+    bits = n.bit_length() + 1
+    k += 2 * n if (k + 2 * n).bit_length() == bits else n
+
+    # 初始化：R1 = 2Q，R0 = Q，二者共享 Z = 2y（XYCZ-IDBL）
+    x, y = Q
+    xx, yy = x * x % p, y * y % p
+    M = (3 * xx + a) % p
+    S = 4 * x * yy % p
+    T = 8 * yy * yy % p
+    X2 = (M * M - 2 * S) % p
+    RX = [S, X2]
+    RY = [T, (M * (S - X2) - T) % p]
+    Z = 2 * y % p
+
+    for i in range(bits - 2, -1, -1):
+        b = (k >> i) & 1
+        # (R_{1-b}, R_b) = ZADDC(R_b, R_{1-b})
+        X3, Y3, X4, Y4, H = _xycz_addc(RX[b], RY[b], RX[1 - b], RY[1 - b], p)
+        RX[1 - b], RY[1 - b], RX[b], RY[b] = X3, Y3, X4, Y4
+        Z = Z * H % p
+        # (R_b, R_{1-b}) = ZADDU(R_{1-b}, R_b)
+        X3, Y3, X4, Y4, H = _xycz_add(RX[1 - b], RY[1 - b], RX[b], RY[b], p)
+        RX[b], RY[b], RX[1 - b], RY[1 - b] = X3, Y3, X4, Y4
+        Z = Z * H % p
+    return Point(RX[0], RY[0], Z)
+
+
+# =================== 公钥预计算表缓存 ===================
+class PrecomputeCache:
+    """公钥 -> 预计算表 的LRU缓存，线程安全，记录命中/未命中次数
+
+    builder(P, p, a) 构建单个点的表，缺省为 w 位窗口表（precompute_points），
+    此时 get_many 对未命中的点改用 precompute_points_batch 共用一次批量模逆。
+    """
+
+    def __init__(self, maxsize=1024, w=4, builder=None):
+        self.maxsize = maxsize
+        self.w = w
+        self.builder = builder
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build_many(self, points, p, a):
+        if self.builder is None:
+            return precompute_points_batch(points, self.w, p, a)
+        return [self.builder(P, p, a) for P in points]
+
+    def _insert(self, items, p, a):
+        with self._lock:
+            for P, table in items:
+                key = (p, a, P)
+                self._tables[key] = table
+                self._tables.move_to_end(key)
+            while len(self._tables) > self.maxsize:
+                self._tables.popitem(last=False)
+
+    def get(self, P, p, a, build=True):
+        """返回点P的表，未命中时构建并放入缓存（build=False 时返回None），超出容量时淘汰最久未使用的表"""
+        key = (p, a, P)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+        if not build:
+            return None
+
+        # 构建表较慢，放在锁外进行；并发未命中时可能重复构建，但结果相同
+        if self.builder is None:
+            table = precompute_points(P, self.w, p, a)
+        else:
+            table = self.builder(P, p, a)
+        self._insert([(P, table)], p, a)
+        return table
+
+    def get_many(self, points, p, a):
+        """批量返回多个点的表，未命中的点一起构建后放入缓存"""
+        tables, missing = {}, []
+        with self._lock:
+            for P in points:
+                table = self._tables.get((p, a, P))
+                if table is not None:
+                    self._tables.move_to_end((p, a, P))
+                    self.hits += 1
+                    tables[P] = table
+                else:
+                    self.misses += 1
+                    missing.append(P)
+
+        built = list(zip(missing, self._build_many(missing, p, a))) if missing else []
+        self._insert(built, p, a)
+        tables.update(built)
+        return [tables[P] for P in points]
 
-    # 转换为Jacobian坐标
-    Q_j = Point(Q[0], Q[1], 1)
-    R = Point(0, 0, 0)
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._tables) > maxsize:
+                self._tables.popitem(last=False)
 
-    # 使用NAF表示法
-    naf_rep = naf(k)
-    for digit in naf_rep:
-        R = double_point_jacobian(R, p, a)
-        if digit == 1:
-            R = add_points_jacobian(R, Q_j, p, a)
-        elif digit == -1:
-            neg_Q = Point(Q_j.x, -Q_j.y % p, Q_j.z)
-            R = add_points_jacobian(R, neg_Q, p, a)
-    return R
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._tables), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+    def __len__(self):
+        return len(self._tables)
+
+
+PUBLIC_KEY_CACHE = PrecomputeCache()
 
 
 # =================== SM2算法实现 ===================
@@ -242,58 +743,190 @@ def on_curve(args, P):
     return pow(y, 2, p) == (pow(x, 3, p) + a * x + b) % p
 
 
-def encry_sm2(args, PB, M, precomputed_G=None, precomputed_PB=None):
+def encry_sm2_bytes(args, PB, M, precomputed_G=None, precomputed_PB=None):
+    """SM2加密（字节版）：M为bytes，返回 C1||C2||C3 的bytes"""
     p, a, *_ = args
-    M_bytes = M.encode('utf-8')
-    k = random.randint(1, args[-1] - 1)
 
-    # 使用预计算表加速
-    if precomputed_G is None:
-        precomputed_G = precompute_points(args[4], 4, p, a)
+    # 使用预计算表加速（未传入时取自公钥缓存）
     if precomputed_PB is None:
-        precomputed_PB = precompute_points(PB, 4, p, a)
+        precomputed_PB = PUBLIC_KEY_CACHE.get(PB, p, a)
 
-    # 计算C1 = k*G
-    C1_point = mult_point_fixed(precomputed_G, k, p, a)
-    C1 = C1_point.to_affine(p)
+    while True:
+        k = secrets.randbelow(args[-1] - 1) + 1  # k 可预测即可算出 k·PB 与密钥流，必须使用CSPRNG
 
-    # 计算k*PB
-    T_point = mult_point_fixed(precomputed_PB, k, p, a)
-    T = T_point.to_affine(p)
+        # 计算C1 = k*G（未传入窗口表时使用模块级缓存的梳状表）
+        if precomputed_G is None:
+            C1_point = mult_base_point(args, k)
+        else:
+            C1_point = mult_point_fixed(precomputed_G, k, p, a)
 
-    # 后续步骤相同
-    x2, y2 = T
-    t = KDF(fielde_to_bits(x2) + fielde_to_bits(y2), len(M_bytes) * 8)
-    if int(t, 2) == 0:
-        raise Exception("KDF返回全0")
-    C2 = int(bytes_to_hex(M_bytes), 16) ^ int(t, 2)
-    C3 = sm3.sm3_hash([i for i in bits_to_bytes(fielde_to_bits(x2) + bytes_to_bits(M_bytes) + fielde_to_bits(y2))])
-    return bits_to_hex(point_to_bits(C1)) + hex(C2)[2:].rjust(len(M_bytes) * 2, '0') + C3
+        # 计算k*PB，两点共用一次模逆转换为仿射坐标
+        T_point = mult_point_fixed(precomputed_PB, k, p, a)
+        C1, (x2, y2) = batch_to_affine([C1_point, T_point], p)
+        C = _encry_sm2_tail(args, C1, x2, y2, M)
+        if C is not None:
+            return C
+
+
+def encry_sm2(args, PB, M, precomputed_G=None, precomputed_PB=None):
+    return encry_sm2_bytes(args, PB, M.encode('utf-8'), precomputed_G, precomputed_PB).hex()
 
 
-def decry_sm2(args, dB, C):
+def encry_sm2_batch(args, PB, messages, precomputed_PB=None):
+    """批量加密发往同一接收方的多条消息，所有C1与k*PB统一做一次批量模逆"""
+    p, a, *_ = args
+    if precomputed_PB is None:
+        precomputed_PB = PUBLIC_KEY_CACHE.get(PB, p, a)
+
+    msgs_bytes = [M.encode('utf-8') for M in messages]
+    points = []
+    for _ in msgs_bytes:
+        k = secrets.randbelow(args[-1] - 1) + 1
+        points.append(mult_base_point(args, k))
+        points.append(mult_point_fixed(precomputed_PB, k, p, a))
+    affine = batch_to_affine(points, p)
+    result = []
+    for i, M_bytes in enumerate(msgs_bytes):
+        C = _encry_sm2_tail(args, affine[2 * i], *affine[2 * i + 1], M_bytes)
+        if C is None:
+            C = encry_sm2_bytes(args, PB, M_bytes, precomputed_PB=precomputed_PB)
+        result.append(C.hex())
+    return result
+
+
+def _encry_sm2_tail(args, C1, x2, y2, M):
+    """由C1和(x2, y2)计算C2、C3并拼接密文（全程bytes，不做比特串转换）；KDF输出全0时返回None，由调用方重新选取k"""
+    l = (args[0].bit_length() + 7) // 8
+    x2_bytes, y2_bytes = x2.to_bytes(l, 'big'), y2.to_bytes(l, 'big')
+    t = KDF_bytes(x2_bytes + y2_bytes, len(M))
+    if M and not any(t):
+        return None
+    C2 = xor_bytes(M, t)
+    C3 = sm3_digest(x2_bytes + M + y2_bytes)
+    return b'\x04' + C1[0].to_bytes(l, 'big') + C1[1].to_bytes(l, 'big') + C2 + C3
+
+
+def _mult_private_key(args, dB, C1, method):
+    """计算 dB·C1；method 为 'wnaf'（默认，最快）或 'ladder'（Co-Z Montgomery阶梯，每位运算量固定）"""
+    p, a, *_, n = args
+    if method == 'wnaf':
+        return mult_point_var(C1, dB, p, a)
+    if method == 'ladder':
+        return mult_point_ladder(C1, dB, p, a, n)
+    raise ValueError("未知的标量乘法方式: %s" % method)
+
+
+def decry_sm2_bytes(args, dB, C, method='wnaf'):
+    """SM2解密（字节版）：C为 C1||C2||C3 的bytes，返回明文bytes；method 见 _mult_private_key"""
     p, a, *_ = args
-    l = ceil(log(p, 2) / 8)
-    C1 = bytes_to_point(hex_to_bytes(C[:(2 * l + 1) * 2]))
+    l = (p.bit_length() + 7) // 8
+    C = memoryview(C)
+    C1 = (int.from_bytes(C[1:l + 1], 'big'), int.from_bytes(C[l + 1:2 * l + 1], 'big'))
     if not on_curve(args, C1):
         raise Exception("C1不在曲线上")
 
     # 使用优化标量乘法计算dB*C1
-    T_point = mult_point_var(C1, dB, p, a)
-    T = T_point.to_affine(p)
-
-    # 后续步骤相同
-    x2, y2 = T
-    klen = (len(C) - (2 * l + 1) * 2 - 64) * 4
-    t = KDF(fielde_to_bits(x2) + fielde_to_bits(y2), klen)
-    if int(t, 2) == 0:
+    x2, y2 = _mult_private_key(args, dB, C1, method).to_affine(p)
+
+    C2 = C[2 * l + 1:-32]
+    x2_bytes, y2_bytes = x2.to_bytes(l, 'big'), y2.to_bytes(l, 'big')
+    t = KDF_bytes(x2_bytes + y2_bytes, len(C2))
+    if C2 and not any(t):
+        raise Exception("KDF返回全0")
+    M = xor_bytes(C2, t)
+    if sm3_digest(x2_bytes + M + y2_bytes) != C[-32:]:
+        raise Exception("Hash验证失败")
+    return M
+
+
+def decry_sm2(args, dB, C, method='wnaf'):
+    return decry_sm2_bytes(args, dB, bytes.fromhex(C), method).decode('utf-8')
+
+
+# =================== 流式加解密 ===================
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def _iter_chunks(src, chunk_size):
+    """将文件对象或bytes块的可迭代对象统一为块迭代器"""
+    if hasattr(src, 'read'):
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from src
+
+
+def encry_sm2_stream(args, PB, src, chunk_size=STREAM_CHUNK_SIZE, precomputed_PB=None):
+    """流式SM2加密：依次产出C1、若干段C2、C3，内存占用与明文长度无关
+
+    src 为以二进制方式打开的文件对象或bytes块的可迭代对象，输出拼接后与 encry_sm2_bytes 格式一致。
+    C1输出后无法再更换k，因此密钥流全0（概率可忽略）时在末尾抛出异常。
+    """
+    p, a, *_ = args
+    if precomputed_PB is None:
+        precomputed_PB = PUBLIC_KEY_CACHE.get(PB, p, a)
+    k = secrets.randbelow(args[-1] - 1) + 1
+    C1_point = mult_base_point(args, k)
+    T_point = mult_point_fixed(precomputed_PB, k, p, a)
+    C1, (x2, y2) = batch_to_affine([C1_point, T_point], p)
+
+    l = (p.bit_length() + 7) // 8
+    x2_bytes, y2_bytes = x2.to_bytes(l, 'big'), y2.to_bytes(l, 'big')
+    yield b'\x04' + C1[0].to_bytes(l, 'big') + C1[1].to_bytes(l, 'big')
+
+    keystream = KDFStream(x2_bytes + y2_bytes)
+    h = SM3Context(x2_bytes)
+    for chunk in _iter_chunks(src, chunk_size):
+        if not chunk:
+            continue
+        h.update(chunk)
+        yield xor_bytes(chunk, keystream.read(len(chunk)))
+    if keystream.length and keystream.all_zero:
+        raise Exception("KDF返回全0")
+    h.update(y2_bytes)
+    yield h.digest()
+
+
+def decry_sm2_stream(args, dB, src, chunk_size=STREAM_CHUNK_SIZE, method='wnaf'):
+    """流式SM2解密：逐段产出明文，始终保留最后32字节作为C3
+
+    C3位于密文末尾，只能在全部明文产出后校验；校验失败时抛出异常，调用方应丢弃已产出的明文。
+    """
+    p, a, *_ = args
+    l = (p.bit_length() + 7) // 8
+    header_len = 2 * l + 1
+    buf = bytearray()
+    keystream = None
+    for chunk in _iter_chunks(src, chunk_size):
+        buf += chunk
+        if keystream is None:
+            if len(buf) < header_len:
+                continue
+            C1 = (int.from_bytes(buf[1:l + 1], 'big'), int.from_bytes(buf[l + 1:header_len], 'big'))
+            if not on_curve(args, C1):
+                raise Exception("C1不在曲线上")
+            del buf[:header_len]
+            x2, y2 = _mult_private_key(args, dB, C1, method).to_affine(p)
+            x2_bytes, y2_bytes = x2.to_bytes(l, 'big'), y2.to_bytes(l, 'big')
+            keystream = KDFStream(x2_bytes + y2_bytes)
+            h = SM3Context(x2_bytes)
+        n = len(buf) - 32
+        if n > 0:
+            M = xor_bytes(buf[:n], keystream.read(n))
+            del buf[:n]
+            h.update(M)
+            yield M
+
+    if keystream is None or len(buf) != 32:
+        raise Exception("密文长度错误")
+    if keystream.length and keystream.all_zero:
         raise Exception("KDF返回全0")
-    C2 = C[(2 * l + 1) * 2:-64]
-    M1 = hex(int(C2, 16) ^ int(t, 2))[2:].rjust(len(C2), '0')
-    u = sm3.sm3_hash([i for i in bits_to_bytes(fielde_to_bits(x2) + hex_to_bits(M1) + fielde_to_bits(y2))])
-    if u != C[-64:]:
+    h.update(y2_bytes)
+    if h.digest() != bytes(buf):
         raise Exception("Hash验证失败")
-    return bytes.fromhex(M1).decode('utf-8')
 
 
 def get_args():
@@ -317,15 +950,11 @@ def get_key():
 
 if __name__ == '__main__':
     args = get_args()
-    p, a, *_ = args
     PB, dB = get_key()
 
-    # 预计算固定基点（实际应用中只需计算一次）
-    precomputed_G = precompute_points(args[4], 4, p, a)
-    precomputed_PB = precompute_points(PB, 4, p, a)
-
+    # 基点G的梳状表与接收方公钥的窗口表均由模块缓存，首次加密时自动构建
     M = input("请输入明文: ")
-    C = encry_sm2(args, PB, M, precomputed_G, precomputed_PB)
+    C = encry_sm2(args, PB, M)
     M_ = decry_sm2(args, dB, C)
 
     print("原文:", M)
@@ -0,0 +1,87 @@
+"""
+多进程批量SM2加解密
+纯Python大整数运算受GIL限制只能使用单核，SM2Pool 将批量任务分块提交到 ProcessPoolExecutor：
+- 基点G的梳状表与接收方公钥的窗口表在父进程构建一次，通过进程初始化函数随进程启动下发，而不是随每个任务传输；
+  指定 table_path 时梳状表改为写入文件，各工作进程以mmap方式加载，启动时无需反序列化且共享页缓存；
+- 任务按 chunk_size 分块提交，结果按输入顺序返回。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from sm2_optimized import get_args, get_key, get_fixed_base_table, set_fixed_base_table, precompute_points, \
+    encry_sm2_bytes, decry_sm2_bytes
+from sm2_table_io import ensure_fixed_base_table, load_fixed_base_table
+
+_worker = {}
+
+
+def _init_worker(args, PB, dB, comb_table, PB_table, table_path):
+    """工作进程初始化：安装预计算表；k 取自 secrets（系统CSPRNG），fork出的进程不会继承相同的随机数状态"""
+    if table_path is not None:
+        load_fixed_base_table(args, table_path)
+    else:
+        set_fixed_base_table(args, comb_table)
+    _worker.update(args=args, PB=PB, dB=dB, PB_table=PB_table)
+
+
+def _encrypt_chunk(messages):
+    args, PB, PB_table = _worker['args'], _worker['PB'], _worker['PB_table']
+    return [encry_sm2_bytes(args, PB, M, precomputed_PB=PB_table) for M in messages]
+
+
+def _decrypt_chunk(job):
+    ciphertexts, method = job
+    args, dB = _worker['args'], _worker['dB']
+    return [decry_sm2_bytes(args, dB, C, method) for C in ciphertexts]
+
+
+class SM2Pool:
+    """多进程SM2加解密池：PB 用于加密，dB 用于解密，二者可只提供其一"""
+
+    def __init__(self, args, PB=None, dB=None, processes=None, chunk_size=64, table_path=None):
+        p, a, *_ = args
+        self.chunk_size = chunk_size
+        PB_table = precompute_points(PB, 4, p, a) if PB is not None else None
+        if table_path is not None:
+            # 父进程只需保证文件存在，不替换自身内存中的梳状表（mmap视图逐项解码，会拖慢父进程后续的加密）
+            ensure_fixed_base_table(args, table_path)
+            comb_table = None
+        else:
+            comb_table = get_fixed_base_table(args)
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker,
+            initargs=(args, PB, dB, comb_table, PB_table, table_path))
+
+    def _chunks(self, items):
+        items = list(items)
+        return [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+
+    def encrypt_many(self, messages):
+        """批量加密bytes明文，按输入顺序返回 C1||C2||C3 密文列表"""
+        return [C for chunk in self._executor.map(_encrypt_chunk, self._chunks(messages)) for C in chunk]
+
+    def decrypt_many(self, ciphertexts, method='wnaf'):
+        """批量解密，按输入顺序返回明文列表；任一密文校验失败时抛出异常"""
+        jobs = [(chunk, method) for chunk in self._chunks(ciphertexts)]
+        return [M for chunk in self._executor.map(_decrypt_chunk, jobs) for M in chunk]
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    import time
+    args = get_args()
+    PB, dB = get_key()
+    messages = [("message %d" % i).encode('utf-8') for i in range(400)]
+
+    start_time = time.time()
+    with SM2Pool(args, PB, dB) as pool:
+        ciphertexts = pool.encrypt_many(messages)
+        plaintexts = pool.decrypt_many(ciphertexts)
+    print(f"多进程加解密 {len(messages)} 条消息: {time.time() - start_time:.3f} 秒")
+    print("验证:", "成功" if plaintexts == messages else "失败")
@@ -0,0 +1,148 @@
+"""
+SM2数字签名（GB/T 32918.2），基于 sm2_optimized 的标量乘法实现
+- 签名：e = SM3(Z_A || M)，(x1, y1) = kG，r = (e + x1) mod n，s = (1 + d)^-1 · (k - r·d) mod n
+- 验签：t = (r + s) mod n，(x1', y1') = s·G + t·P_A，检查 (e + x1') mod n == r
+  其中 s·G + t·P_A 使用Shamir/Straus交错法在一条倍点链上同时计算
+"""
+import secrets
+from sm2_optimized import get_args, calc_inverse, sm3_digest, PUBLIC_KEY_CACHE, PrecomputeCache, \
+    precompute_fixed_base, mult_base_point, mult_point_comb, mult_point_shamir, add_points_jacobian, \
+    get_base_wnaf_table, batch_to_affine
+from sm3_context import SM3Context
+
+DEFAULT_ID = b'1234567812345678'
+BATCH_COMB_THRESHOLD = 32  # 同一公钥的签名数达到该值时为其构建梳状表
+_ZA_PREFIX = {}
+# 批量验签中的公钥梳状表缓存，默认保留64张（每张约 33×129 个点）；SM2 的 n 与 p 位数相同
+COMB_TABLE_CACHE = PrecomputeCache(
+    maxsize=64, builder=lambda P, p, a: precompute_fixed_base(P, p, a, bits=p.bit_length()))
+
+
+def gen_key_sm2(args):
+    """生成密钥对 (dA, PA)，dA ∈ [1, n-2]，取自 secrets（CSPRNG），不可由已输出的随机数推出"""
+    p, *_, n = args
+    dA = secrets.randbelow(n - 2) + 1
+    return dA, mult_base_point(args, dA).to_affine(p)
+
+
+def _za_prefix(args, ID):
+    """ENTL_A || ID_A || a || b || xG || yG 压缩后的SM3中间状态，按 (曲线参数, ID) 缓存"""
+    key = (args[0], args[1], args[2], args[4], ID)
+    ctx = _ZA_PREFIX.get(key)
+    if ctx is None:
+        p, a, b, _, G, _ = args
+        l = (p.bit_length() + 7) // 8
+        data = (len(ID) * 8).to_bytes(2, 'big') + ID
+        for v in (a, b, G[0], G[1]):
+            data += v.to_bytes(l, 'big')
+        ctx = _ZA_PREFIX[key] = SM3Context(data)
+    return ctx
+
+
+def compute_za(args, PA, ID=DEFAULT_ID):
+    """Z_A = SM3(ENTL_A || ID_A || a || b || xG || yG || xA || yA)，固定前缀从缓存的中间状态继续"""
+    l = (args[0].bit_length() + 7) // 8
+    h = _za_prefix(args, ID).copy()
+    h.update(PA[0].to_bytes(l, 'big') + PA[1].to_bytes(l, 'big'))
+    return h.digest()
+
+
+def _hash_message(args, PA, M, ID):
+    """e = SM3(Z_A || M)，以整数形式返回"""
+    return int.from_bytes(sm3_digest(compute_za(args, PA, ID) + M), 'big')
+
+
+def sign_sm2(args, dA, M, ID=DEFAULT_ID, PA=None):
+    """SM2签名：M为bytes，返回 (r, s)；PA缺省时由dA计算"""
+    p, *_, n = args
+    if PA is None:
+        PA = mult_base_point(args, dA).to_affine(p)
+    e = _hash_message(args, PA, M, ID)
+    d_inv = calc_inverse(1 + dA, n)
+    while True:
+        k = secrets.randbelow(n - 1) + 1  # k 可预测即可由 d = (k - s)(s + r)^-1 恢复私钥，必须使用CSPRNG
+        x1, _ = mult_base_point(args, k).to_affine(p)
+        r = (e + x1) % n
+        if r == 0 or r + k == n:
+            continue
+        s = d_inv * (k - r * dA) % n
+        if s != 0:
+            return r, s
+
+
+def verify_sm2(args, PA, M, sig, ID=DEFAULT_ID, precomputed_PA=None):
+    """SM2验签：s·G + t·P_A 由一次Shamir交错标量乘法得到；precomputed_PA 缺省时取自公钥缓存"""
+    p, a, *_, n = args
+    r, s = sig
+    if not (1 <= r < n and 1 <= s < n):
+        return False
+    t = (r + s) % n
+    if t == 0:
+        return False
+    if precomputed_PA is None:
+        precomputed_PA = PUBLIC_KEY_CACHE.get(PA, p, a)
+
+    X = mult_point_shamir(get_base_wnaf_table(args), s, precomputed_PA, t, p, a)
+    if X.z == 0:
+        return False
+    x1, _ = X.to_affine(p)
+    return (_hash_message(args, PA, M, ID) + x1) % n == r
+
+
+def verify_batch(args, items, ID=DEFAULT_ID):
+    """批量验签：items 为 (PA, M, sig) 序列，返回与之一一对应的布尔值列表
+
+    - 按公钥分组，每个公钥只计算一次 Z_A 与预计算表；
+    - 签名数达到 BATCH_COMB_THRESHOLD 的公钥构建梳状表并放入 COMB_TABLE_CACHE，之后的调用中
+      已有梳状表的公钥直接复用，s·G 与 t·P_A 都不再需要倍点；
+      其余公钥的 w=4 窗口表取自 PUBLIC_KEY_CACHE，未命中的表共用一次批量模逆构建，再做Shamir交错标量乘法；
+    - 所有签名的 s·G + t·P_A 结果只做一次批量模逆。
+    SM2签名只含 r = (e + x1) mod n，无法恢复 R 点的 y 坐标符号，随机线性组合式的批量验证
+    （Σz_i(s_iG + t_iP_i - R_i) = O）不适用，因此仍逐条计算，结果也逐条给出。
+    """
+    p, a, *_, n = args
+    items = list(items)
+    counts = {}
+    for PA, _, _ in items:
+        counts[PA] = counts.get(PA, 0) + 1
+
+    comb_tables = {}
+    for PA, c in counts.items():
+        table = COMB_TABLE_CACHE.get(PA, p, a, build=c >= BATCH_COMB_THRESHOLD)
+        if table is not None:
+            comb_tables[PA] = table
+    keys = [PA for PA in counts if PA not in comb_tables]
+    tables = dict(zip(keys, PUBLIC_KEY_CACHE.get_many(keys, p, a)))
+    za = {PA: compute_za(args, PA, ID) for PA in counts}
+
+    results = [False] * len(items)
+    points, pending = [], []
+    for i, (PA, M, (r, s)) in enumerate(items):
+        if not (1 <= r < n and 1 <= s < n):
+            continue
+        t = (r + s) % n
+        if t == 0:
+            continue
+        if PA in comb_tables:
+            X = add_points_jacobian(mult_base_point(args, s), mult_point_comb(comb_tables[PA], t, p, a), p, a)
+        else:
+            X = mult_point_shamir(get_base_wnaf_table(args), s, tables[PA], t, p, a)
+        if X.z == 0:
+            continue
+        points.append(X)
+        pending.append((i, r, int.from_bytes(sm3_digest(za[PA] + M), 'big')))
+
+    for (x1, _), (i, r, e) in zip(batch_to_affine(points, p), pending):
+        results[i] = (e + x1) % n == r
+    return results
+
+
+if __name__ == '__main__':
+    args = get_args()
+    dA, PA = gen_key_sm2(args)
+    M = input("请输入待签名消息: ").encode('utf-8')
+    sig = sign_sm2(args, dA, M, PA=PA)
+    print("签名: r = %064x" % sig[0])
+    print("      s = %064x" % sig[1])
+    print("验签:", "成功" if verify_sm2(args, PA, M, sig) else "失败")
+    print("篡改后验签:", "成功" if verify_sm2(args, PA, M + b'!', sig) else "失败")
@@ -0,0 +1,152 @@
+"""
+SM2预计算表的二进制序列化与mmap加载
+文件格式（大端）：
+- 头部 16 字节：魔数 b'SM2T' | 版本(1) | 类型(1，0=奇数倍点窗口表，1=梳状表) | w(1) | 保留(1) | 行数(4) | 列数(2) | 坐标字节数(2)
+- 之后依次为各表项的 x || y，每个坐标定长、大端编码，无穷远点记为全0
+
+窗口表只存奇数倍点 P, 3P, ..., (2^w-1)P；梳状表每行存 j·2^(w·i)·P (1 <= j <= 2^(w-1))。
+加载时用 mmap 映射整个文件，表项在被访问时才解码为 Point，不缓存Python整数，
+多个进程映射同一文件时共享页缓存。
+"""
+import mmap
+import os
+import struct
+from sm2_optimized import Point, COMB_W, get_fixed_base_table, set_fixed_base_table
+
+MAGIC = b'SM2T'
+VERSION = 1
+KIND_WINDOW = 0
+KIND_COMB = 1
+HEADER = struct.Struct('>4sBBBxIHH')
+
+
+def _write_table(path, kind, w, rows, coord_len, entries):
+    with open(path, 'wb') as f:
+        cols = 0
+        body = bytearray()
+        for row in entries:
+            cols = len(row)
+            for P in row:
+                if P.z == 0:
+                    body += bytes(2 * coord_len)
+                elif P.z == 1:
+                    body += P.x.to_bytes(coord_len, 'big') + P.y.to_bytes(coord_len, 'big')
+                else:
+                    raise ValueError("表项须规范化为Z=1后才能保存")
+        f.write(HEADER.pack(MAGIC, VERSION, kind, w, rows, cols, coord_len))
+        f.write(body)
+
+
+def save_window_table(path, table, coord_len=32):
+    """保存 precompute_points 生成的奇数倍点窗口表"""
+    w = (len(table) - 1).bit_length()
+    _write_table(path, KIND_WINDOW, w, 1, coord_len, [table[1::2]])
+
+
+def save_comb_table(path, table, w=COMB_W, coord_len=32):
+    """保存 precompute_fixed_base 生成的梳状表，也接受 load_table 返回的 MappedCombTable"""
+    _write_table(path, KIND_COMB, w, len(table), coord_len,
+                 [[row[j] for j in range(1, len(row))] for row in table])
+
+
+class _MappedTable:
+    """mmap映射的表文件，entry(i) 在访问时解码第i个表项"""
+
+    def __init__(self, mm, w, rows, cols, coord_len):
+        self._mm = mm
+        self.w = w
+        self.rows = rows
+        self.cols = cols
+        self.coord_len = coord_len
+
+    def entry(self, i):
+        l = self.coord_len
+        off = HEADER.size + 2 * l * i
+        x = int.from_bytes(self._mm[off:off + l], 'big')
+        y = int.from_bytes(self._mm[off + l:off + 2 * l], 'big')
+        if x == 0 and y == 0:
+            return Point(0, 0, 0)
+        return Point(x, y, 1)
+
+    def close(self):
+        self._mm.close()
+
+
+class MappedWindowTable(_MappedTable):
+    """与 precompute_points 结果下标一致的只读视图：table[i] = iP（i为奇数），table[0] 为无穷远点"""
+
+    def __len__(self):
+        return 1 << self.w
+
+    def __getitem__(self, i):
+        if i == 0:
+            return Point(0, 0, 0)
+        if not i & 1:
+            return None
+        return self.entry((i - 1) >> 1)
+
+
+class _CombRow:
+    __slots__ = ('table', 'base')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.base = row * table.cols
+
+    def __len__(self):
+        return self.table.cols + 1
+
+    def __getitem__(self, j):
+        if j == 0:
+            return Point(0, 0, 0)
+        return self.table.entry(self.base + j - 1)
+
+
+class MappedCombTable(_MappedTable):
+    """与 precompute_fixed_base 结果下标一致的只读视图：table[i][j] = j·2^(w·i)·P"""
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+        return _CombRow(self, i)
+
+
+def load_table(path):
+    """以mmap方式加载表文件，按类型返回 MappedWindowTable 或 MappedCombTable"""
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mm) < HEADER.size:
+        mm.close()
+        raise ValueError("不是有效的预计算表文件: %s" % path)
+    magic, version, kind, w, rows, cols, coord_len = HEADER.unpack_from(mm)
+    if magic != MAGIC or version != VERSION or len(mm) != HEADER.size + rows * cols * 2 * coord_len:
+        mm.close()
+        raise ValueError("不是有效的预计算表文件: %s" % path)
+    cls = MappedCombTable if kind == KIND_COMB else MappedWindowTable
+    return cls(mm, w, rows, cols, coord_len)
+
+
+def ensure_fixed_base_table(args, path, w=COMB_W):
+    """文件不存在时构建基点G的梳状表并写入，不改动 sm2_optimized 的模块缓存"""
+    if not os.path.exists(path):
+        tmp = path + '.tmp%d' % os.getpid()
+        save_comb_table(tmp, get_fixed_base_table(args, w), w)
+        os.replace(tmp, path)
+
+
+def load_fixed_base_table(args, path, w=COMB_W):
+    """加载基点G的梳状表文件并安装到 sm2_optimized 的模块缓存；文件不存在时先构建并写入"""
+    ensure_fixed_base_table(args, path, w)
+    table = load_table(path)
+    G = args[4]
+    if not isinstance(table, MappedCombTable):
+        table.close()
+        raise ValueError("表文件不是梳状表: %s" % path)
+    if table.w != w or (table[0][1].x, table[0][1].y) != G:
+        table.close()
+        raise ValueError("表文件与当前曲线参数不匹配: %s" % path)
+    set_fixed_base_table(args, table, w)
+    return table
@@ -0,0 +1,39 @@
+"""
+增量SM3上下文，sm2.py、sm2_optimized.py 与 sm2_sign.py 共用
+KDF 的 Z、签名的 Z_A 固定前缀等只需压缩一次，之后从保存的中间状态 copy() 继续。
+"""
+from gmssl import sm3
+
+
+class SM3Context:
+    """增量SM3上下文（基于gmssl的压缩函数 sm3_cf），内部只缓存不足64字节的尾部"""
+
+    def __init__(self, data=b''):
+        self.v = sm3.IV
+        self.buf = bytearray()
+        self.length = 0
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        self.length += len(data)
+        buf = self.buf
+        buf += data
+        n = len(buf) & ~63
+        v = self.v
+        for i in range(0, n, 64):
+            v = sm3.sm3_cf(v, buf[i:i + 64])
+        del buf[:n]
+        self.v = v
+
+    def copy(self):
+        other = SM3Context()
+        other.v, other.buf, other.length = self.v, bytearray(self.buf), self.length
+        return other
+
+    def digest(self):
+        tail = self.buf + b'\x80' + b'\x00' * ((55 - len(self.buf)) % 64) + (self.length * 8).to_bytes(8, 'big')
+        v = self.v
+        for i in range(0, len(tail), 64):
+            v = sm3.sm3_cf(v, tail[i:i + 64])
+        return b''.join(x.to_bytes(4, 'big') for x in v)